@@ -0,0 +1,315 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : arrow_io.py
+# Description      : Columnar trades and counterparties output (Parquet or
+# Arrow IPC) with typed columns, and a batch reader over those files for
+# XTDBInserter and offline analytics.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# arrow_io.py
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for the parquet and arrow output formats
+    pa = None
+
+from pricing import TickScale
+from timestamps import DAY_US
+from trade_batch import TradeBatch, TRADE_FIELDS, CATEGORICAL_FIELDS, NULL_INT
+
+logger = logging.getLogger(__name__)
+
+ARROW_FORMATS = ("parquet", "arrow")
+
+# Precision of the decimal price column
+PRICE_PRECISION = 18
+
+TIMESTAMP_COLUMNS = ("execution_timestamp", "trade_report_time", "_valid_from", "_valid_to")
+DATE_COLUMNS = ("settlement_date",)
+# Scenario fields carried by some trades; any other extra field is kept as
+# JSON in the "extras" column
+TYPED_EXTRA_FIELDS = ("pattern_role", "scenario_instance", "layer_sequence", "correction_reason")
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Parquet and Arrow output need pyarrow: pip install pyarrow")
+
+def _price_scale_digits(price_scale: TickScale) -> int:
+    """Decimal places needed to hold every multiple of the tick size exactly."""
+    return max(0, -price_scale.tick_size.normalize().as_tuple().exponent)
+
+def trade_schema(price_scale: TickScale) -> "pa.Schema":
+    _require_pyarrow()
+    timestamp = pa.timestamp("us", tz="UTC")
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    fields = []
+    for name in TRADE_FIELDS:
+        if name in TIMESTAMP_COLUMNS:
+            fields.append(pa.field(name, timestamp, nullable=name == "_valid_to"))
+        elif name in DATE_COLUMNS:
+            fields.append(pa.field(name, pa.date32()))
+        elif name == "price":
+            fields.append(pa.field(name, pa.decimal128(PRICE_PRECISION, _price_scale_digits(price_scale))))
+        elif name == "quantity":
+            fields.append(pa.field(name, pa.int64()))
+        elif name in CATEGORICAL_FIELDS:
+            fields.append(pa.field(name, dictionary))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    fields += [
+        pa.field("pattern_role", dictionary),
+        pa.field("scenario_instance", pa.string()),
+        pa.field("layer_sequence", pa.int32()),
+        pa.field("correction_reason", dictionary),
+        pa.field("extras", pa.string())
+    ]
+    return pa.schema(fields)
+
+def counterparty_schema() -> "pa.Schema":
+    _require_pyarrow()
+    timestamp = pa.timestamp("us", tz="UTC")
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        pa.field("_id", pa.string()),
+        pa.field("type", dictionary),
+        pa.field("executing_broker_id", dictionary),
+        pa.field("clearing_broker_id", dictionary),
+        pa.field("clearing_account", pa.string()),
+        pa.field("correspondent_id", dictionary),
+        pa.field("beneficial_owner_id", pa.string()),
+        pa.field("account_type", dictionary),
+        pa.field("account_category", dictionary),
+        pa.field("status", dictionary),
+        pa.field("risk_rating", dictionary),
+        pa.field("trading_limit", pa.float64()),
+        pa.field("_valid_from", timestamp),
+        pa.field("_valid_to", timestamp),
+        pa.field("cp_update_sequence", pa.int64()),
+        pa.field("credit_status", dictionary),
+        pa.field("margin_requirement", pa.int64()),
+        pa.field("settlement_instructions", pa.struct([
+            pa.field("default_currency", pa.string()),
+            pa.field("settlement_method", pa.string()),
+            pa.field("settlement_cycle", pa.string())
+        ]))
+    ])
+
+class _DictionaryEncoder:
+    """
+    One growing dictionary per column for a whole file. Each chunk's codes
+    are remapped onto it, so later chunks only ever add dictionary entries
+    (Arrow IPC files can't replace a dictionary part way through). The
+    dictionary array is kept between chunks and only extended when a chunk
+    brought new categories.
+    """
+    def __init__(self):
+        self.categories: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        self._dictionary: "pa.Array" = pa.array([], pa.string())
+
+    def _code(self, value: Any) -> int:
+        # Nulls are masked out rather than stored in the dictionary
+        if value is None:
+            return 0
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def _array(self, codes: np.ndarray, mask: np.ndarray) -> "pa.DictionaryArray":
+        built = len(self._dictionary)
+        if len(self.categories) > built:
+            self._dictionary = pa.concat_arrays(
+                [self._dictionary, pa.array(self.categories[built:], pa.string())]
+            )
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, pa.int32(), mask=mask if mask.any() else None),
+            self._dictionary
+        )
+
+    def encode(self, codes: np.ndarray, categories: List[Any]) -> "pa.DictionaryArray":
+        """Remap a DictionaryColumn's codes and categories onto the file dictionary."""
+        mapping = np.array([self._code(c) for c in categories], dtype=np.int32)
+        null = np.array([c is None for c in categories], dtype=bool)
+        if not len(categories):
+            return self._array(codes.astype(np.int32), np.zeros(len(codes), dtype=bool))
+        return self._array(mapping[codes], null[codes])
+
+    def encode_values(self, values: List[Any]) -> "pa.DictionaryArray":
+        codes = np.array([self._code(v) for v in values], dtype=np.int32)
+        return self._array(codes, np.array([v is None for v in values], dtype=bool))
+
+def _decimal_prices(ticks: np.ndarray, price_scale: TickScale, digits: int) -> "pa.Array":
+    """Build the decimal128 price column straight from tick integers."""
+    multiplier = int(price_scale.tick_size * 10 ** digits)
+    unscaled = np.asarray(ticks, dtype=np.int64) * multiplier
+    # decimal128 is a little-endian 128-bit integer: low word, then the sign
+    words = np.empty((len(unscaled), 2), dtype=np.int64)
+    words[:, 0] = unscaled
+    words[:, 1] = unscaled >> 63
+    return pa.Array.from_buffers(
+        pa.decimal128(PRICE_PRECISION, digits), len(unscaled), [None, pa.py_buffer(words)]
+    )
+
+class ArrowWriter:
+    """
+    Writes trades or counterparties to a Parquet or Arrow IPC file with typed
+    columns: timestamps as timestamp[us, UTC], settlement_date as date32,
+    price as decimal128 (built from the integer ticks without going through
+    strings), and symbol, venue, broker ids and other repeated strings
+    dictionary encoded. Every write() becomes one row group or record batch.
+
+    Columnar files can't be appended to, so append=True with an existing
+    file is an error.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        price_scale: Optional[TickScale] = None,
+        append: bool = False,
+        file_format: str = "parquet",
+        record_type: str = "trade",
+        compression: Optional[str] = "zstd"
+    ):
+        _require_pyarrow()
+        if file_format not in ARROW_FORMATS:
+            raise ValueError(f"Unknown columnar format {file_format!r}; expected one of {ARROW_FORMATS}")
+        if append and Path(file_path).is_file():
+            raise ValueError(f"Can't append to {file_format} file {file_path}; use ndjson output to extend a dataset")
+        self.file_path = file_path
+        self.price_scale = price_scale or TickScale()
+        self.file_format = file_format
+        self.record_type = record_type
+        self.count = 0
+        self.schema = trade_schema(self.price_scale) if record_type == "trade" else counterparty_schema()
+        self._dictionaries = {
+            f.name: _DictionaryEncoder() for f in self.schema if pa.types.is_dictionary(f.type)
+        }
+        self._price_digits = _price_scale_digits(self.price_scale)
+        if file_format == "parquet":
+            self._writer = pq.ParquetWriter(file_path, self.schema, compression=compression)
+        else:
+            options = ipc.IpcWriteOptions(
+                compression=compression if compression in ("zstd", "lz4") else None,
+                emit_dictionary_deltas=True
+            )
+            self._writer = ipc.new_file(file_path, self.schema, options=options)
+
+    def _trade_batch(self, trades: TradeBatch) -> "pa.RecordBatch":
+        n = len(trades)
+        columns = []
+        for field in self.schema:
+            name = field.name
+            if name in TIMESTAMP_COLUMNS:
+                values = trades.ints[name]
+                mask = values == NULL_INT if name == "_valid_to" else None
+                columns.append(pa.array(values, field.type, mask=mask))
+            elif name in DATE_COLUMNS:
+                columns.append(pa.array((trades.ints[name] // DAY_US).astype(np.int32), pa.date32()))
+            elif name == "price":
+                columns.append(_decimal_prices(trades.ints[name], self.price_scale, self._price_digits))
+            elif name == "quantity":
+                columns.append(pa.array(trades.ints[name], pa.int64()))
+            elif name == "_id":
+                columns.append(pa.array(trades.column("_id"), pa.string()))
+            elif name in trades.categoricals:
+                column = trades.categoricals[name]
+                columns.append(self._dictionaries[name].encode(column.codes, column.categories))
+            elif name == "extras":
+                other = [None] * n
+                for row, fields in trades.extras.items():
+                    rest = {k: v for k, v in fields.items() if k not in TYPED_EXTRA_FIELDS}
+                    if rest:
+                        other[row] = json.dumps(rest, default=str)
+                columns.append(pa.array(other, pa.string()))
+            else:
+                values = [None] * n
+                for row, fields in trades.extras.items():
+                    values[row] = fields.get(name)
+                if name in self._dictionaries:
+                    columns.append(self._dictionaries[name].encode_values(values))
+                else:
+                    columns.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def _counterparty_batch(self, records: List[Dict[str, Any]]) -> "pa.RecordBatch":
+        columns = []
+        for field in self.schema:
+            values = [record.get(field.name) for record in records]
+            if field.name in self._dictionaries:
+                columns.append(self._dictionaries[field.name].encode_values(values))
+            else:
+                columns.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def write(self, records: Union[TradeBatch, List[Dict[str, Any]]]) -> None:
+        if not len(records):
+            return
+        if self.record_type == "trade":
+            if not isinstance(records, TradeBatch):
+                records = TradeBatch.from_records(records)
+            batch = self._trade_batch(records)
+        else:
+            batch = self._counterparty_batch(records)
+        self._writer.write_batch(batch)
+        self.count += batch.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
+
+    def __enter__(self) -> "ArrowWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def _to_records(batch: "pa.RecordBatch") -> List[Dict[str, Any]]:
+    """
+    Plain dicts from a record batch, shaped like the records in a JSON output
+    file: timestamps come back as datetimes and prices as Decimals, and the
+    scenario fields only appear on the trades that carry them.
+    """
+    records = batch.to_pylist()
+    if "extras" in batch.schema.names:
+        for record in records:
+            extras = record.pop("extras")
+            for name in TYPED_EXTRA_FIELDS:
+                if record.get(name) is None:
+                    record.pop(name, None)
+            if extras:
+                record.update(json.loads(extras))
+    return records
+
+def iter_arrow_batches(file_path: str, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a Parquet or Arrow IPC output file back as lists of at most
+    batch_size records. Arrow IPC files are memory-mapped, so columns are
+    read in place rather than copied off disk first.
+    """
+    _require_pyarrow()
+    with open(file_path, "rb") as f:
+        is_arrow_file = f.read(6) == b"ARROW1"
+
+    if is_arrow_file:
+        with pa.memory_map(file_path, "r") as source:
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, batch_size):
+                    yield _to_records(batch.slice(start, batch_size))
+    else:
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=batch_size):
+            yield _to_records(batch)
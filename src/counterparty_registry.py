@@ -0,0 +1,222 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : counterparty_registry.py
+# Description      : Indexed store of the current counterparty versions
+# used by the generator and the scenarios.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# counterparty_registry.py
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class _PositionIndex:
+    """
+    Registry positions grouped by the value of one attribute. Buckets are
+    lists and every position's slot in its bucket is tracked, so adding a
+    position is an append and removing one is a swap-and-pop, both O(1).
+    """
+    __slots__ = ("buckets", "_slots")
+
+    def __init__(self):
+        self.buckets: Dict[Any, List[int]] = {}
+        # Position -> index in its bucket (a position is in exactly one bucket)
+        self._slots: Dict[int, int] = {}
+
+    def add(self, value: Any, position: int) -> None:
+        bucket = self.buckets.setdefault(value, [])
+        self._slots[position] = len(bucket)
+        bucket.append(position)
+
+    def remove(self, value: Any, position: int) -> None:
+        bucket = self.buckets[value]
+        slot = self._slots.pop(position)
+        last = bucket.pop()
+        if last != position:
+            bucket[slot] = last
+            self._slots[last] = slot
+        if not bucket:
+            del self.buckets[value]
+
+    def contains(self, value: Any, position: int) -> bool:
+        bucket = self.buckets.get(value)
+        slot = self._slots.get(position)
+        return bucket is not None and slot is not None and slot < len(bucket) and bucket[slot] == position
+
+    def copy(self) -> "_PositionIndex":
+        clone = _PositionIndex()
+        clone.buckets = {k: list(v) for k, v in self.buckets.items()}
+        clone._slots = dict(self._slots)
+        return clone
+
+class CounterpartyRegistry:
+    """
+    Holds the current version of every counterparty with O(1) lookup by _id and
+    secondary indexes by beneficial owner and account type.
+
+    Counterparties keep a stable position for their whole life (a new version
+    replaces the old one in place), so the registry also behaves like a
+    read-only sequence: len(), iteration, registry[i] and random.choice() all
+    work the way they did on the old plain list.
+
+    add() and update() maintain the secondary indexes in O(1) per call.
+    copy() copies the indexes, so a copy never sees changes made to the
+    original.
+    """
+    def __init__(self, counterparties: Iterable[Dict[str, Any]] = ()):
+        self._versions: List[Dict[str, Any]] = list(counterparties)
+        self._position_by_id: Dict[str, int] = {
+            cp["_id"]: position for position, cp in enumerate(self._versions)
+        }
+        if len(self._position_by_id) != len(self._versions):
+            raise ValueError("Duplicate counterparty _id in registry")
+
+        self._by_owner = _PositionIndex()
+        self._by_account_type = _PositionIndex()
+        for position, cp in enumerate(self._versions):
+            self._by_owner.add(cp["beneficial_owner_id"], position)
+            self._by_account_type.add(cp["account_type"], position)
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._versions)
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        return self._versions[position]
+
+    def __contains__(self, cp_id: str) -> bool:
+        return cp_id in self._position_by_id
+
+    def copy(self) -> "CounterpartyRegistry":
+        """Copy of the registry; the version dicts themselves are never mutated."""
+        clone = CounterpartyRegistry()
+        clone._versions = list(self._versions)
+        clone._position_by_id = dict(self._position_by_id)
+        clone._by_owner = self._by_owner.copy()
+        clone._by_account_type = self._by_account_type.copy()
+        return clone
+
+    def _indexes(self) -> Tuple[Tuple[str, _PositionIndex], ...]:
+        return (
+            ("beneficial_owner_id", self._by_owner),
+            ("account_type", self._by_account_type)
+        )
+
+    def add(self, counterparty: Dict[str, Any]) -> int:
+        """
+        Register a new counterparty.
+
+        Returns:
+            The counterparty's position in the registry
+
+        Raises:
+            ValueError: If a counterparty with the same _id is already registered
+        """
+        cp_id = counterparty["_id"]
+        if cp_id in self._position_by_id:
+            raise ValueError(f"Counterparty {cp_id} is already registered")
+
+        position = len(self._versions)
+        self._versions.append(counterparty)
+        self._position_by_id[cp_id] = position
+        for key, index in self._indexes():
+            index.add(counterparty[key], position)
+        return position
+
+    def update(self, counterparty: Dict[str, Any]) -> None:
+        """
+        Replace the current version of a counterparty with a new one, keeping its
+        position and moving it between secondary indexes only if the indexed
+        attributes changed.
+
+        Raises:
+            KeyError: If the counterparty is not registered
+        """
+        position = self._position_by_id[counterparty["_id"]]
+        previous = self._versions[position]
+        self._versions[position] = counterparty
+
+        for key, index in self._indexes():
+            if previous[key] != counterparty[key]:
+                index.remove(previous[key], position)
+                index.add(counterparty[key], position)
+
+    def get(self, cp_id: str) -> Optional[Dict[str, Any]]:
+        """Current version of a counterparty by _id, or None."""
+        position = self._position_by_id.get(cp_id)
+        return self._versions[position] if position is not None else None
+
+    def position_of(self, cp_id: str) -> int:
+        return self._position_by_id[cp_id]
+
+    def by_beneficial_owner(self, owner_id: str) -> List[Dict[str, Any]]:
+        """All counterparties sharing a beneficial owner."""
+        return [self._versions[p] for p in self._by_owner.buckets.get(owner_id, ())]
+
+    def by_account_type(self, *account_types: str) -> List[Dict[str, Any]]:
+        """All counterparties with any of the given account types."""
+        return [
+            self._versions[p]
+            for account_type in account_types
+            for p in self._by_account_type.buckets.get(account_type, ())
+        ]
+
+    def choice(
+        self,
+        rand: Any,
+        account_types: Optional[Iterable[str]] = None,
+        beneficial_owner: Optional[str] = None,
+        exclude: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pick a counterparty uniformly at random without building a filtered list.
+
+        Args:
+            rand: Anything with a random() method returning a float in [0, 1)
+                  (the random module, random.Random or a NumPy Generator)
+            account_types: Restrict the pick to these account types
+            beneficial_owner: Restrict the pick to this beneficial owner's
+                  counterparties (takes precedence over account_types)
+            exclude: _id of a counterparty that must not be picked
+
+        Returns:
+            A counterparty, or None if none match
+        """
+        excluded = self._position_by_id.get(exclude) if exclude is not None else None
+        excluded_bucket = None
+        if beneficial_owner is not None:
+            buckets = [self._by_owner.buckets.get(beneficial_owner, [])]
+            if excluded is not None and self._by_owner.contains(beneficial_owner, excluded):
+                excluded_bucket = buckets[0]
+        elif account_types is not None:
+            account_types = list(account_types)
+            buckets = [self._by_account_type.buckets.get(t, []) for t in account_types]
+            if excluded is not None:
+                excluded_bucket = next(
+                    (b for t, b in zip(account_types, buckets) if self._by_account_type.contains(t, excluded)),
+                    None
+                )
+        else:
+            buckets = [range(len(self._versions))]
+            if excluded is not None:
+                excluded_bucket = buckets[0]
+
+        # Draw from every position but one, then swap the excluded position for
+        # the one left out, which keeps the pick uniform over the rest
+        total = sum(len(b) for b in buckets) - (excluded_bucket is not None)
+        if total <= 0:
+            return None
+        pick = int(rand.random() * total)
+        for bucket in buckets:
+            size = len(bucket) - (bucket is excluded_bucket)
+            if pick < size:
+                position = bucket[pick]
+                if position == excluded:
+                    position = bucket[-1]
+                return self._versions[position]
+            pick -= size
+        return None
@@ -0,0 +1,189 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : dataset_cache.py
+# Description      : Content-addressed cache of generated output files,
+# keyed on everything in the config that shapes the data plus the seed,
+# with least-recently-used eviction once it outgrows its size limit.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# dataset_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the generator's output changes for the same config and seed
+CACHE_FORMAT_VERSION = 5
+
+# Config sections that decide what gets generated. Output paths, database
+# settings and the worker count (output is identical for any worker count)
+# don't change the data and are left out of the key.
+KEY_SECTIONS = ("date_range", "securities", "generation", "scenario_toggles", "scenario_schedule")
+IGNORED_GENERATION_KEYS = ("workers",)
+# Output options that change the content or layout of the files.
+# output.serializer is left out: every backend writes identical bytes
+# (tests/test_serializers.py holds them to it).
+KEY_OUTPUT_OPTIONS = (
+    "sort_by_valid_from", "format", "json_indent", "compression",
+    "stream_compression", "shard_by", "symbol_buckets"
+)
+
+DEFAULT_CACHE_DIR = ".dataset_cache"
+DEFAULT_MAX_SIZE_MB = 2048
+
+MANIFEST_FILE = "manifest.json"
+
+def dataset_cache_key(config: Dict[str, Any]) -> Optional[str]:
+    """
+    SHA-256 of the effective generation config, or None when no
+    generation.seed is set (every run is then different and can't be reused).
+    """
+    generation = config.get("generation", {})
+    if generation.get("seed") is None:
+        return None
+
+    effective = {section: config.get(section) for section in KEY_SECTIONS}
+    effective["generation"] = {
+        k: v for k, v in generation.items() if k not in IGNORED_GENERATION_KEYS
+    }
+    effective["output"] = {
+        k: config.get("output", {}).get(k) for k in KEY_OUTPUT_OPTIONS
+    }
+    effective["format_version"] = CACHE_FORMAT_VERSION
+    canonical = json.dumps(effective, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _size(path: Path) -> int:
+    """Bytes in a file, or in all the files under a directory."""
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+class DatasetCache:
+    """
+    One directory per cache key holding copies of the generated artifacts
+    (trades file or shard directory, counterparties file, ...) and a
+    manifest. An entry is
+    written to a temporary directory and renamed into place, so a crashed
+    run never leaves a half-written entry behind.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size_mb: float = DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["DatasetCache"]:
+        """The cache configured under cache:, or None if it is disabled."""
+        cache_config = config.get("cache", {})
+        if not cache_config.get("enabled"):
+            return None
+        return cls(
+            cache_config.get("dir", DEFAULT_CACHE_DIR),
+            cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+        )
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def restore(self, key: str, destinations: Dict[str, str]) -> bool:
+        """
+        Copy a cached entry's artifacts to their output paths.
+
+        Args:
+            key: Cache key from dataset_cache_key()
+            destinations: Artifact name -> output path
+
+        Returns:
+            True on a hit, False if the entry is missing or lacks an artifact
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        artifacts = manifest.get("artifacts", {})
+        if any(name not in artifacts for name in destinations):
+            return False
+
+        for name, destination in destinations.items():
+            source = entry / artifacts[name]["file"]
+            if source.is_dir():
+                shutil.rmtree(destination, ignore_errors=True)
+                shutil.copytree(source, destination)
+            else:
+                shutil.copyfile(source, destination)
+
+        # Mark the entry as recently used for eviction
+        os.utime(entry / MANIFEST_FILE)
+        logger.info(f"Dataset cache hit {key[:12]}: restored {', '.join(destinations)}")
+        return True
+
+    def store(self, key: str, sources: Dict[str, str]) -> None:
+        """
+        Copy freshly generated artifacts into the cache, then evict old
+        entries until the cache fits its size limit again.
+
+        Args:
+            key: Cache key from dataset_cache_key()
+            sources: Artifact name -> path of the generated file or directory
+        """
+        entry = self._entry(key)
+        staging = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        artifacts = {}
+        for name, source in sources.items():
+            file_name = f"{name}{Path(source).suffix}"
+            if Path(source).is_dir():
+                shutil.copytree(source, staging / file_name)
+            else:
+                shutil.copyfile(source, staging / file_name)
+            artifacts[name] = {"file": file_name, "bytes": _size(staging / file_name)}
+
+        with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "created": time.time(), "artifacts": artifacts}, f, indent=4)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+        logger.info(f"Dataset cache stored {key[:12]} ({sum(a['bytes'] for a in artifacts.values())} bytes)")
+
+        self.evict(keep=key)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """(last used, size in bytes, path) of every complete entry."""
+        entries = []
+        if not self.cache_dir.is_dir():
+            return entries
+        for entry in self.cache_dir.iterdir():
+            manifest = entry / MANIFEST_FILE
+            if entry.name.startswith(".") or not manifest.is_file():
+                continue
+            size = _size(entry)
+            entries.append((manifest.stat().st_mtime, size, entry))
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the cache is within max_size_mb."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logger.info(f"Dataset cache evicted {entry.name[:12]} ({size} bytes)")
@@ -0,0 +1,169 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : external_sort.py
+# Description      : Bounded-memory external merge sort of trades by
+# _valid_from (ties broken by _id), so output files come out in time order
+# however many corrections and scenarios were mixed in.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# external_sort.py
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from trade_batch import TradeBatch
+
+logger = logging.getLogger(__name__)
+
+# Trades held in memory before a sorted run is spilled to disk
+DEFAULT_RUN_ROWS = 500_000
+# Trades read back from each run at a time while merging
+DEFAULT_CHUNK_ROWS = 16_384
+
+def sort_keys(batch: TradeBatch) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (_valid_from, high 8 bytes of _id, low 8 bytes of _id) per row. The _id
+    halves are read big-endian, so they order exactly like the UUID strings.
+    """
+    ids = np.ascontiguousarray(batch.ids)
+    halves = ids.view(">u8").reshape(len(batch), 2) if len(batch) else np.zeros((0, 2), dtype=">u8")
+    return batch.ints["_valid_from"], halves[:, 0], halves[:, 1]
+
+def sort_batch(batch: TradeBatch) -> TradeBatch:
+    valid_from, id_high, id_low = sort_keys(batch)
+    return batch.take(np.lexsort((id_low, id_high, valid_from)))
+
+def _at_or_before(batch: TradeBatch, bound: Tuple[int, int, int]) -> int:
+    """Number of leading rows of a sorted batch whose key is <= bound."""
+    valid_from, id_high, id_low = sort_keys(batch)
+    b_from, b_high, b_low = bound
+    mask = (valid_from < b_from) | (
+        (valid_from == b_from) & ((id_high < b_high) | ((id_high == b_high) & (id_low <= b_low)))
+    )
+    # The batch is sorted, so the rows at or before the bound are a prefix
+    return int(mask.sum())
+
+class _RunReader:
+    """Reads one spilled run back a chunk at a time."""
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self.chunk: Optional[TradeBatch] = None
+        self.advance()
+
+    def advance(self) -> None:
+        try:
+            self.chunk = pickle.load(self._file)
+        except EOFError:
+            self.close()
+
+    def close(self) -> None:
+        self.chunk = None
+        self._file.close()
+
+    def last_key(self) -> Tuple[int, int, int]:
+        valid_from, id_high, id_low = sort_keys(self.chunk)
+        return int(valid_from[-1]), int(id_high[-1]), int(id_low[-1])
+
+class ExternalTradeSorter:
+    """
+    Collects TradeBatches through write() (the same interface as the output
+    writers) and replays them in (_valid_from, _id) order from sorted_batches().
+
+    At most run_rows trades are held in memory: each full buffer is sorted and
+    spilled to a temporary run file in chunks. The merge keeps one chunk per
+    run in memory and repeatedly emits everything up to the smallest chunk
+    maximum, so it works on whole arrays rather than row by row. When nothing
+    had to be spilled the buffer is simply sorted in memory.
+    """
+    def __init__(
+        self,
+        run_rows: int = DEFAULT_RUN_ROWS,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        tmp_dir: Optional[str] = None
+    ):
+        self.run_rows = run_rows
+        self.chunk_rows = chunk_rows
+        self.count = 0
+        self._tmp_dir = tmp_dir
+        self._work_dir: Optional[str] = None
+        self._buffer: List[TradeBatch] = []
+        self._buffered = 0
+        self._runs: List[str] = []
+        # Open run readers while sorted_batches() merges, closed by close()
+        self._readers: List[_RunReader] = []
+
+    def write(self, trades: TradeBatch) -> None:
+        if not isinstance(trades, TradeBatch):
+            trades = TradeBatch.from_records(trades)
+        if not len(trades):
+            return
+        self._buffer.append(trades)
+        self._buffered += len(trades)
+        self.count += len(trades)
+        if self._buffered >= self.run_rows:
+            self._spill()
+
+    def _spill(self) -> None:
+        run = sort_batch(TradeBatch.concat(self._buffer))
+        self._buffer, self._buffered = [], 0
+
+        if self._work_dir is None:
+            self._work_dir = tempfile.mkdtemp(prefix="trade_sort_", dir=self._tmp_dir)
+        path = os.path.join(self._work_dir, f"run_{len(self._runs):05d}.pkl")
+        with open(path, "wb") as f:
+            for start in range(0, len(run), self.chunk_rows):
+                chunk = run[start:start + self.chunk_rows].compact()
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        logger.info(f"Spilled sorted run {len(self._runs)} ({len(run)} trades)")
+
+    def sorted_batches(self) -> Iterator[TradeBatch]:
+        """All trades written so far, as TradeBatches in (_valid_from, _id) order."""
+        if not self._runs:
+            if self._buffered:
+                yield sort_batch(TradeBatch.concat(self._buffer))
+            return
+
+        if self._buffered:
+            self._spill()
+        logger.info(f"Merging {len(self._runs)} sorted runs of {self.count} trades")
+        self._readers = [_RunReader(path) for path in self._runs]
+        readers = [r for r in self._readers if r.chunk is not None]
+        while readers:
+            # Everything up to the smallest chunk maximum is final
+            bound = min(r.last_key() for r in readers)
+            parts = []
+            for reader in readers:
+                n = _at_or_before(reader.chunk, bound)
+                if n:
+                    parts.append(reader.chunk[:n])
+                    reader.chunk = reader.chunk[n:]
+                if not len(reader.chunk):
+                    reader.advance()
+            readers = [r for r in readers if r.chunk is not None]
+            yield sort_batch(TradeBatch.concat(parts))
+
+    def close(self) -> None:
+        """Close any run files still open from an unfinished merge and remove the spilled runs."""
+        for reader in self._readers:
+            reader.close()
+        self._readers = []
+        if self._work_dir:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+        self._buffer, self._buffered, self._runs = [], 0, []
+
+    def __enter__(self) -> "ExternalTradeSorter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -8,13 +8,27 @@
 # ************************************************************************
 # generator.py
 
+import gc
+import json
 import random
-import uuid
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Callable, Dict, List, Any, Tuple, Optional, Iterator, Union
 from decimal import Decimal
 
+import numpy as np
+
+from counterparty_registry import CounterpartyRegistry
+from timestamps import to_epoch_us, SECOND_US, MINUTE_US, DAY_US
+from pricing import TickScale, DEFAULT_TICK_SIZE
+from trade_batch import TradeBatch, DictionaryColumn, NULL_INT
+from price_paths import PricePathEngine
+from trade_ids import TradeIdProvider, DEFAULT_ID_FORMAT
+
 # class BitemporalDataGenerator:
 #     """
 #     Generates bitemporal data for trades and counterparties with realistic financial patterns.
@@ -393,6 +407,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EXECUTION_VENUES = ["NYSE", "NASDAQ", "ARCA", "BATS"]
+TRADE_SIDES = ["B", "S"]
+CORRECTION_REASONS = [
+    "Price adjustment",
+    "Quantity revision",
+    "Settlement instruction update",
+    "Counterparty correction"
+]
+CP_STATUSES = ["active", "suspended", "restricted"]
+CP_RISK_RATINGS = ["A", "B", "C", "D"]
+
+# spawn_keys reserved for the non-daily streams; days use their ordinal (always > 1)
+_CP_CHANGE_STREAM = 0
+_UNIVERSE_STREAM = 1
+_PRICE_STREAM = 2
+_TRADE_ID_STREAM = 3
+# Scenario streams are keyed (_SCENARIO_STREAM, day ordinal)
+_SCENARIO_STREAM = 4
+# The one-off scenario run's streams, keyed the same way
+_ONE_OFF_SCENARIO_STREAM = 5
+
+# Builds a day's scenario trades inside iter_dataset()'s shard tasks, so it
+# must be picklable when generation.workers > 1
+DayScenarios = Callable[["BitemporalDataGenerator", datetime], TradeBatch]
+
+# Bump when the checkpoint layout, or the output a resumed run continues, changes
+CHECKPOINT_VERSION = 2
+
 class BitemporalDataGenerator:
     """
     Generates bitemporal data for trades and counterparties with realistic financial patterns.
@@ -407,6 +449,9 @@ class BitemporalDataGenerator:
         """
         self.start_date = datetime.strptime(start_date, '%Y-%m-%d')
         self.end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        # Internally all timestamps are integer epoch microseconds (UTC)
+        self._start_us = to_epoch_us(self.start_date)
+        self._end_us = to_epoch_us(self.end_date)
 
         self.config = config or {}
         self.max_trades = self.config.get("generation", {}).get("trades_per_day")
@@ -414,7 +459,46 @@ class BitemporalDataGenerator:
             self.max_trades = 25        
 
         logger.info(f"The number of trades being generated is: {self.max_trades}")
-        
+
+        # Every random stream is derived from one root seed so a run can be
+        # reproduced; without generation.seed fresh entropy is drawn and logged
+        self.seed_entropy = np.random.SeedSequence(
+            self.config.get("generation", {}).get("seed")
+        ).entropy
+        logger.info(f"Generation seed: {self.seed_entropy}")
+        self.rng = np.random.default_rng(self.seed_entropy)
+        self._random = random.Random(self.seed_entropy)
+        self._universe_rng = np.random.default_rng(
+            np.random.SeedSequence(self.seed_entropy, spawn_key=(_UNIVERSE_STREAM,))
+        )
+
+        # Seeded trade IDs; daily batches draw theirs from the day's own stream
+        self.trade_ids = TradeIdProvider(
+            np.random.default_rng(
+                np.random.SeedSequence(self.seed_entropy, spawn_key=(_TRADE_ID_STREAM,))
+            ),
+            self.config.get("generation", {}).get("trade_id_format") or DEFAULT_ID_FORMAT
+        )
+
+        # Where the next iter_dataset() run starts and what it resumes from.
+        # from_checkpoint() moves these on to the day after a saved run.
+        self._first_day = self.start_date
+        self._resumed = False
+        self._cp_change_rng_state = np.random.default_rng(
+            np.random.SeedSequence(self.seed_entropy, spawn_key=(_CP_CHANGE_STREAM,))
+        ).bit_generator.state
+        # Set by iter_dataset() once it has generated through end_date
+        self._generated_through: Optional[datetime] = None
+        self._cp_change_rng_end_state = self._cp_change_rng_state
+
+        # Number of worker processes generate_dataset() spreads days across
+        self.workers = self.config.get("generation", {}).get("workers") or 1
+
+        # Size of the simulated universe
+        self.num_counterparties = self.config.get("generation", {}).get("num_counterparties") or 9
+        self.num_traders = self.config.get("generation", {}).get("num_traders") or 5
+        logger.info(f"Universe size: {self.num_counterparties} counterparties, {self.num_traders} traders")
+
 
         # Build self.securities from config or fallback
         securities_list = self.config.get("securities", [])
@@ -436,9 +520,64 @@ class BitemporalDataGenerator:
                     "volatility": volatility
                 }
 
-        self.traders = self._generate_initial_traders()
-        self.counterparties = self._generate_initial_counterparties()
-        self.trading_relationships = self._initialize_trading_relationships()
+        # Prices are held as integer ticks everywhere in the generator
+        self.price_scale = TickScale(
+            self.config.get("generation", {}).get("tick_size", DEFAULT_TICK_SIZE)
+        )
+
+        # Column views of the securities used by generate_trades_batch()
+        self.security_tickers = list(self.securities.keys())
+        self._base_prices = np.array(
+            [float(s["base_price"]) for s in self.securities.values()], dtype=np.float64
+        )
+        self._volatilities = np.array(
+            [s["volatility"] for s in self.securities.values()], dtype=np.float64
+        )
+        self._security_index = {ticker: i for i, ticker in enumerate(self.security_tickers)}
+
+        # Trades price off one simulated intraday path per security per day
+        self.price_paths = PricePathEngine(
+            self._base_prices,
+            self._volatilities,
+            self.price_scale,
+            self.seed_entropy,
+            _PRICE_STREAM,
+            self.start_date
+        )
+
+        # Building a large universe allocates millions of small dicts and lists;
+        # the cyclic GC would otherwise rescan them over and over while they are built
+        gc.disable()
+        try:
+            self.traders = self._generate_initial_traders()
+            self.counterparties = CounterpartyRegistry(self._generate_initial_counterparties())
+            # Versions in effect at start_date; generate_dataset() replays from here
+            self._initial_counterparties = self.counterparties.copy()
+            self.trading_relationships = self._initialize_trading_relationships()
+        finally:
+            gc.enable()
+
+        # Category lists for the dictionary-encoded columns of generated
+        # TradeBatches, indexed by trader / counterparty position. The
+        # counterparty attributes copied onto trades never change between
+        # versions, so these are built once from the initial versions.
+        self._trader_ids = [t["trader_id"] for t in self.traders]
+        self._algo_ids = self._trader_ids + ["NONE"]
+        self._algo_codes = np.array(
+            [i if t["algo_enabled"] else len(self.traders) for i, t in enumerate(self.traders)],
+            dtype=np.int32
+        )
+        self._cp_trade_fields = {
+            field: [cp[key] for cp in self._initial_counterparties]
+            for field, key in (
+                ("executing_broker_id", "executing_broker_id"),
+                ("clearing_broker_id", "clearing_broker_id"),
+                ("clearing_account", "clearing_account"),
+                ("beneficial_owner_id", "beneficial_owner_id"),
+                ("account_type", "account_type"),
+                ("counterparty_id", "_id")
+            )
+        }
 
     def _generate_initial_traders(self) -> List[Dict[str, Any]]:
         trader_types = [
@@ -450,19 +589,19 @@ class BitemporalDataGenerator:
         ]
         
         traders = []
-        for i in range(1, 6):
+        for i in range(1, self.num_traders + 1):
             trader_id = f"TR{str(i).zfill(3)}"
-            desk, strategy = random.choice(trader_types)
+            desk, strategy = self._random.choice(trader_types)
             traders.append({
                 "trader_id": trader_id,
                 "desk": desk,
                 "strategy_type": strategy,
-                "algo_enabled": random.choice([True, False]),
+                "algo_enabled": self._random.choice([True, False]),
                 "permissions": {
-                    "max_order_size": random.randint(10000, 100000),
-                    "markets": random.sample(list(self.securities.keys()), 
-                                          random.randint(2, len(self.securities))),
-                    "risk_limit": random.randint(1000000, 5000000)
+                    "max_order_size": self._random.randint(10000, 100000),
+                    "markets": self._random.sample(list(self.securities.keys()), 
+                                          self._random.randint(2, len(self.securities))),
+                    "risk_limit": self._random.randint(1000000, 5000000)
                 }
             })
         return traders
@@ -471,6 +610,10 @@ class BitemporalDataGenerator:
         """
         Generate counterparty entities with complete regulatory and business attributes,
         including valid timestamps for _valid_from/_valid_to recognized by XTDB 2.0.
+
+        The number of counterparties comes from generation.num_counterparties.
+        Attributes are drawn as NumPy arrays for the whole universe at once, so
+        even millions of counterparties only cost one dict build each.
         """
         account_types = {
             'R': 'Retail',
@@ -486,116 +629,164 @@ class BitemporalDataGenerator:
             'C': {'trading_limit': 1000000, 'probability': 0.2},
             'D': {'trading_limit': 500000, 'probability': 0.1}
         }
-        
+        credit_statuses = ["Approved", "Watch", "Restricted"]
+        settlement_methods = ["DTC", "FED", "SWIFT"]
+
+        n = self.num_counterparties
+        rng = self._universe_rng
+        rating_keys = list(risk_ratings.keys())
+        type_keys = list(account_types.keys())
+
+        risk_rating_idx = rng.choice(
+            len(rating_keys), n, p=[r['probability'] for r in risk_ratings.values()]
+        ).tolist()
+        account_type_idx = rng.integers(0, len(type_keys), n).tolist()
+        account_category_idx = rng.integers(0, len(type_keys), n).tolist()
+        credit_status_idx = rng.integers(0, len(credit_statuses), n).tolist()
+        margin_requirements = rng.integers(25, 101, n).tolist()
+        settlement_method_idx = rng.integers(0, len(settlement_methods), n).tolist()
+
+        # Epoch microseconds, rendered as a full UTC timestamp on output
+        valid_from_us = self._start_us
+
         counterparties = []
-        for i in range(1, 10):
-            cp_id = f"CP{str(i).zfill(3)}"
-            risk_rating = random.choices(
-                list(risk_ratings.keys()),
-                weights=[r['probability'] for r in risk_ratings.values()]
-            )[0]
-            # Format the start date as a full timestamp with UTC suffix
-            valid_from_str = self.start_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-            
+        for (i, risk_rating, account_type, account_category, credit_status,
+             margin_requirement, settlement_method) in zip(
+                range(1, n + 1),
+                [rating_keys[r] for r in risk_rating_idx],
+                [type_keys[t] for t in account_type_idx],
+                [account_types[type_keys[t]] for t in account_category_idx],
+                [credit_statuses[c] for c in credit_status_idx],
+                margin_requirements,
+                [settlement_methods[m] for m in settlement_method_idx]):
             counterparties.append({
-                "_id": cp_id,
+                "_id": f"CP{i:03d}",
                 "type": "counterparty",
                 "executing_broker_id": f"EXEC{i}",
                 "clearing_broker_id": f"CLR{i}",
-                "clearing_account": f"CA{str(i).zfill(6)}",
+                "clearing_account": f"CA{i:06d}",
                 "correspondent_id": f"CORR{i}",
-                "beneficial_owner_id": f"BO{str(i).zfill(6)}",
+                "beneficial_owner_id": f"BO{i:06d}",
                 
-                "account_type": random.choice(list(account_types.keys())),
-                "account_category": account_types[random.choice(list(account_types.keys()))],
+                "account_type": account_type,
+                "account_category": account_category,
                 "status": "active",
                 "risk_rating": risk_rating,
                 "trading_limit": risk_ratings[risk_rating]['trading_limit'],
                 
                 # Full timestamp string recognized by XTDB as TIMESTAMP WITH TIMEZONE
-                "_valid_from": valid_from_str,
+                "_valid_from": valid_from_us,
                 "_valid_to": None,
                 "cp_update_sequence": 1,
                 
-                "credit_status": random.choice(["Approved", "Watch", "Restricted"]),
-                "margin_requirement": random.randint(25, 100),
+                "credit_status": credit_status,
+                "margin_requirement": margin_requirement,
                 "settlement_instructions": {
                     "default_currency": "USD",
-                    "settlement_method": random.choice(["DTC", "FED", "SWIFT"]),
+                    "settlement_method": settlement_method,
                     "settlement_cycle": "T+2"
                 }
             })
         return counterparties
 
     def _initialize_trading_relationships(self) -> Dict[str, List[str]]:
-        if len(self.counterparties) < 2:
+        """
+        Give every counterparty 2-4 distinct trading partners other than itself.
+
+        Partners are drawn for all counterparties at once as offsets into the
+        other n-1 counterparties (so a counterparty can never pick itself), which
+        keeps this linear in the universe size. The few rows that drew the same
+        partner twice are redrawn individually.
+        """
+        n = len(self.counterparties)
+        if n < 2:
             raise ValueError("Need at least 2 counterparties to establish trading relationships")
-            
-        relationships = {}
-        for cp in self.counterparties:
-            max_partners = min(4, len(self.counterparties) - 1)
-            min_partners = min(2, max_partners)
-            other_counterparties = [c["_id"] for c in self.counterparties if c["_id"] != cp["_id"]]
-            num_partners = random.randint(min_partners, max_partners)
-            trading_partners = random.sample(other_counterparties, num_partners)
-            relationships[cp["_id"]] = trading_partners
-        return relationships
-
-    def _generate_price(self, security: str, is_suspicious: bool = False) -> Decimal:
-        base_price = float(self.securities[security]['base_price'])
-        volatility = self.securities[security]['volatility']
+
+        rng = self._universe_rng
+        max_partners = min(4, n - 1)
+        min_partners = min(2, max_partners)
+        num_partners = rng.integers(min_partners, max_partners + 1, n)
+
+        # Draw from [0, n-1) and shift anything at or past our own position up by one
+        positions = np.arange(n)[:, None]
+        partners = rng.integers(0, n - 1, (n, max_partners))
+        partners += partners >= positions
+
+        # Only the first num_partners columns of each row are used
+        used = np.arange(max_partners)[None, :] < num_partners[:, None]
+        ordered = np.sort(np.where(used, partners, -1), axis=1)
+        has_duplicates = ((ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] >= 0)).any(axis=1)
+        for i in np.flatnonzero(has_duplicates).tolist():
+            redrawn = rng.choice(n - 1, int(num_partners[i]), replace=False)
+            partners[i, :len(redrawn)] = redrawn + (redrawn >= i)
+
+        ids = np.array([cp["_id"] for cp in self.counterparties], dtype=object)
+        return {
+            cp_id: row[:k]
+            for cp_id, row, k in zip(ids.tolist(), ids[partners].tolist(), num_partners.tolist())
+        }
+
+    def _generate_price(
+        self,
+        security: str,
+        timestamp: Union[datetime, int],
+        is_suspicious: bool = False
+    ) -> int:
+        """
+        Price for a single trade, in ticks: the security's path price at the
+        execution time, pushed away from it for suspicious trades.
+        """
+        price = self.price_paths.price_at(self._security_index[security], timestamp)
         
         if is_suspicious:
-            variation = random.uniform(0.15, 0.25)
-            direction = 1 if random.random() > 0.5 else -1
-        else:
-            variation = random.uniform(-volatility, volatility)
-            direction = 1
+            variation = self._random.uniform(0.15, 0.25)
+            direction = 1 if self._random.random() > 0.5 else -1
+            price += int(self.price_scale.to_ticks_array(np.float64(direction * variation)))
         
-        price = base_price * 1 + (direction * variation)
-        return Decimal(str(round(price, 2)))
+        return max(price, 1)
 
     def generate_trade(
         self,
-        trade_date: datetime,
+        trade_date: Union[datetime, int],
         is_suspicious: bool = False,
         scenario_type: Optional[str] = "normal",
         counterparty_id: Optional[str] = None,
-        side: Optional[str] = None
+        side: Optional[str] = None,
+        symbol: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Generate a single trade with complete execution and counterparty details,
-        including full timestamp strings for all relevant fields.
+        Generate a single trade with complete execution and counterparty details.
+        trade_date is the execution time in epoch microseconds (a datetime is
+        also accepted); all timestamp fields are kept as epoch microseconds.
+        Random choices come from the generator's seeded Python RNG.
         """
-        trade_id = str(uuid.uuid4())
-        security = random.choice(list(self.securities.keys()))
+        # The main timestamp, also used as _valid_from
+        exec_ts = to_epoch_us(trade_date)
         
-        cp = (next((cp for cp in self.counterparties if cp["_id"] == counterparty_id), None)
-              if counterparty_id else random.choice(self.counterparties))
+        trade_id = self.trade_ids.next_id(exec_ts)
+        security = symbol if symbol else self._random.choice(self.security_tickers)
         
-        trader = random.choice(self.traders)
-        trade_side = side if side else random.choice(["B", "S"])
+        cp = (self.counterparties.get(counterparty_id)
+              if counterparty_id else self._random.choice(self.counterparties))
         
-        # Format the main timestamp as a full UTC date-time
-        exec_ts_str = trade_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        valid_from_str = exec_ts_str
+        trader = self._random.choice(self.traders)
+        trade_side = side if side else self._random.choice(["B", "S"])
         
         # trade_report_time is a few seconds after execution
-        report_ts = trade_date + timedelta(seconds=random.randint(1, 5))
-        report_ts_str = report_ts.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        report_ts = exec_ts + self._random.randint(1, 5) * SECOND_US
         
-        # settlement_date is okay as a plain date if you want
-        settle_date = (trade_date + timedelta(days=2)).strftime('%Y-%m-%d')
+        # settlement_date is rendered as a plain date
+        settle_ts = exec_ts + 2 * DAY_US
         
         return {
             "_id": trade_id,
             "type": "trade",
             "scenario_type": scenario_type,
             
-            "execution_timestamp": exec_ts_str,
+            "execution_timestamp": exec_ts,
             "symbol": security,
-            "price": self._generate_price(security, is_suspicious),
-            "quantity": random.randint(100, 1000),
+            "price": self._generate_price(security, exec_ts, is_suspicious),
+            "quantity": self._random.randint(100, 1000),
             "side": trade_side,
             
             "executing_broker_id": cp["executing_broker_id"],
@@ -607,104 +798,532 @@ class BitemporalDataGenerator:
             "counterparty_id": cp["_id"],
             
             # For bitemporality
-            "_valid_from": valid_from_str,
+            "_valid_from": exec_ts,
             "_valid_to": None,
             
-            "trade_report_time": report_ts_str,
-            "settlement_date": settle_date,
+            "trade_report_time": report_ts,
+            "settlement_date": settle_ts,
             "trade_status": "executed",
-            "execution_venue": random.choice(["NYSE", "NASDAQ", "ARCA", "BATS"]),
+            "execution_venue": self._random.choice(EXECUTION_VENUES),
             "execution_capacity": cp["account_type"],
             "algo_id": trader["trader_id"] if trader["algo_enabled"] else "NONE"
         }
 
+    def generate_trades_batch(
+        self,
+        n: int,
+        day: Union[datetime, int],
+        suspicious_rate: float = 0.15
+    ) -> TradeBatch:
+        """
+        Generate n trades for a single day in one shot.
+
+        Every field is drawn for the whole day as a NumPy array (the same
+        distributions generate_trade() and _generate_price() use) and goes
+        straight into a TradeBatch; string fields are codes into the
+        generator's own lists of tickers, traders and counterparty attributes.
+
+        Args:
+            n: Number of trades to draw
+            day: Midnight of the trading day
+            suspicious_rate: Fraction of trades priced as suspicious outliers
+
+        Returns:
+            TradeBatch holding the day's trades
+        """
+        rng = self.rng
+        security = rng.integers(0, len(self.security_tickers), n)
+        minute = rng.integers(0, 1441, n)
+        exec_us = to_epoch_us(day) + minute * MINUTE_US
+
+        # Same price model as _generate_price(), vectorised across the day:
+        # a lookup into the day's cached price paths plus the suspicious offsets
+        suspicious = rng.random(n) < suspicious_rate
+        suspicious_variation = rng.uniform(0.15, 0.25, n) * np.where(rng.random(n) > 0.5, 1, -1)
+        price = self.price_paths.prices(day, security, minute) + np.where(
+            suspicious, self.price_scale.to_ticks_array(suspicious_variation), 0
+        )
+        price = np.maximum(price, 1)
+
+        id_bytes = self.trade_ids.bulk(n, exec_us, rng=rng)
+
+        report_us = exec_us + rng.integers(1, 6, n) * SECOND_US
+        quantity = rng.integers(100, 1001, n)
+        side = rng.integers(0, len(TRADE_SIDES), n).astype(np.int32)
+        cp = rng.integers(0, len(self.counterparties), n).astype(np.int32)
+        trader = rng.integers(0, len(self.traders), n).astype(np.int32)
+        venue = rng.integers(0, len(EXECUTION_VENUES), n).astype(np.int32)
+
+        cp_fields = self._cp_trade_fields
+        return TradeBatch(
+            id_bytes,
+            {
+                "execution_timestamp": exec_us,
+                "price": price,
+                "quantity": quantity,
+                # For bitemporality
+                "_valid_from": exec_us.copy(),
+                "_valid_to": np.full(n, NULL_INT, dtype=np.int64),
+                "trade_report_time": report_us,
+                "settlement_date": exec_us + 2 * DAY_US
+            },
+            {
+                "type": DictionaryColumn.constant("trade", n),
+                "scenario_type": DictionaryColumn.constant("normal", n),
+                "symbol": DictionaryColumn(security.astype(np.int32), self.security_tickers),
+                "side": DictionaryColumn(side, TRADE_SIDES),
+                "executing_broker_id": DictionaryColumn(cp, cp_fields["executing_broker_id"]),
+                "executing_trader_id": DictionaryColumn(trader, self._trader_ids),
+                "clearing_broker_id": DictionaryColumn(cp, cp_fields["clearing_broker_id"]),
+                "clearing_account": DictionaryColumn(cp, cp_fields["clearing_account"]),
+                "beneficial_owner_id": DictionaryColumn(cp, cp_fields["beneficial_owner_id"]),
+                "account_type": DictionaryColumn(cp, cp_fields["account_type"]),
+                "counterparty_id": DictionaryColumn(cp, cp_fields["counterparty_id"]),
+                "trade_status": DictionaryColumn.constant("executed", n),
+                "execution_venue": DictionaryColumn(venue, EXECUTION_VENUES),
+                "execution_capacity": DictionaryColumn(cp, cp_fields["account_type"]),
+                "algo_id": DictionaryColumn(self._algo_codes[trader], self._algo_ids)
+            }
+        )
+
     def generate_trade_correction(
         self,
         trade: Dict[str, Any],
-        correction_date: datetime
+        correction_date: Union[datetime, int]
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Generate a correction for an existing trade, maintaining temporal validity
-        with updated timestamps that are recognized by XTDB 2.0 as TIMESTAMP WITH TIME ZONE.
+        Generate a correction for an existing trade, maintaining temporal validity.
+        correction_date is in epoch microseconds (a datetime is also accepted); the
+        validity bounds are rendered as XTDB TIMESTAMP WITH TIME ZONE on output.
         """
+        correction_ts = to_epoch_us(correction_date)
+
         # End validity of original
         original_trade = trade.copy()
-        original_trade["_valid_to"] = correction_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        original_trade["_valid_to"] = correction_ts
         
         corrected_trade = trade.copy()
         corrected_trade.update({
-            "price": Decimal(str(float(trade["price"]) * (1 + random.uniform(-0.02, 0.02)))),
+            "price": int(round(trade["price"] * (1 + self.rng.uniform(-0.02, 0.02)))),
             "trade_status": "corrected",
-            "correction_reason": random.choice([
-                "Price adjustment",
-                "Quantity revision",
-                "Settlement instruction update",
-                "Counterparty correction"
-            ]),
-            "_valid_from": correction_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            "correction_reason": CORRECTION_REASONS[self.rng.integers(len(CORRECTION_REASONS))],
+            "_valid_from": correction_ts,
             "_valid_to": None
         })
         
         return original_trade, corrected_trade
 
-    def generate_dataset(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    def generate_batch_corrections(
+        self,
+        batch: TradeBatch,
+        rows: np.ndarray,
+        correction_ts: np.ndarray
+    ) -> Tuple[TradeBatch, TradeBatch]:
+        """
+        Vectorised generate_trade_correction() for the given rows of a batch.
+
+        Args:
+            batch: Trades to correct
+            rows: Positions of the corrected trades in the batch
+            correction_ts: Correction time of each row, in epoch microseconds
+
+        Returns:
+            (originals with _valid_to closed, corrected versions), row-aligned
+        """
+        k = len(rows)
+        original_trades = batch.take(rows)
+        original_trades.set_column("_valid_to", correction_ts)
+
+        corrected_trades = batch.take(rows)
+        corrected_trades.set_column(
+            "price",
+            np.rint(corrected_trades.ints["price"] * (1 + self.rng.uniform(-0.02, 0.02, k)))
+        )
+        corrected_trades.set_column("trade_status", "corrected")
+        for i, reason in enumerate(self.rng.integers(len(CORRECTION_REASONS), size=k).tolist()):
+            corrected_trades.extras.setdefault(i, {})["correction_reason"] = CORRECTION_REASONS[reason]
+        corrected_trades.set_column("_valid_from", correction_ts)
+        corrected_trades.set_column("_valid_to", None)
+
+        return original_trades, corrected_trades
+
+    def _day_rng(self, day: datetime) -> np.random.Generator:
+        """
+        RNG stream for a single trading day, keyed on the root seed and the date.
+        A day always draws the same numbers no matter which shard or worker
+        process generates it.
+        """
+        return np.random.default_rng(
+            np.random.SeedSequence(self.seed_entropy, spawn_key=(day.toordinal(),))
+        )
+
+    @contextmanager
+    def scenario_streams(self, day: datetime, one_off: bool = False) -> Iterator[random.Random]:
+        """
+        Swap in RNG streams and a trade-ID provider keyed on the root seed and
+        the day for the duration of the block, so scenarios built for a day
+        come out the same in any process. Yields the day's Python RNG.
+        one_off selects the one-off scenario run's streams, which are kept
+        apart from the scheduled scenarios' streams for the same day.
+        """
+        stream = _ONE_OFF_SCENARIO_STREAM if one_off else _SCENARIO_STREAM
+        seed = np.random.SeedSequence(self.seed_entropy, spawn_key=(stream, day.toordinal()))
+        numpy_seed, id_seed, python_seed = seed.spawn(3)
+        saved = self.rng, self._random, self.trade_ids
+        self.rng = np.random.default_rng(numpy_seed)
+        self._random = random.Random(int(python_seed.generate_state(1, np.uint64)[0]))
+        self.trade_ids = TradeIdProvider(np.random.default_rng(id_seed), saved[2].id_format)
+        try:
+            yield self._random
+        finally:
+            self.rng, self._random, self.trade_ids = saved
+
+    def trading_days(self) -> List[datetime]:
+        """The days iter_dataset() generates, in order."""
+        days = []
+        current_date = self._first_day
+        while current_date <= self.end_date:
+            days.append(current_date)
+            current_date += timedelta(days=1)
+        return days
+
+    def _plan_counterparty_changes(
+        self,
+        days: List[datetime]
+    ) -> List[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+        """
+        Walk the date range once, serially, and decide every counterparty change
+        up front from a dedicated RNG stream. This is cheap (one draw per day) and
+        lets day shards run independently: each shard replays the changes dated
+        before it instead of depending on the shards that came earlier.
+
+        The stream resumes from the state saved in a checkpoint, if any, so an
+        extended run makes the same changes a single longer run would have.
+
+        Returns:
+            List of (day ordinal, original version, new version) in date order
+        """
+        saved_rng, saved_counterparties = self.rng, self.counterparties
+        self.rng = np.random.default_rng(
+            np.random.SeedSequence(self.seed_entropy, spawn_key=(_CP_CHANGE_STREAM,))
+        )
+        self.rng.bit_generator.state = self._cp_change_rng_state
+        # generate_counterparty_change() updates this scratch copy as it goes
+        self.counterparties = self._initial_counterparties.copy()
+        try:
+            changes = []
+            for day in days:
+                if self.rng.random() < 0.1:
+                    cp = self.counterparties[int(self.rng.integers(len(self.counterparties)))]
+                    original, updated = self.generate_counterparty_change(cp, day)
+                    changes.append((day.toordinal(), original, updated))
+            self._cp_change_rng_end_state = self.rng.bit_generator.state
+            return changes
+        finally:
+            self.rng, self.counterparties = saved_rng, saved_counterparties
+
+    def _generate_day(self, day: datetime, corrected_after: Optional[int] = None) -> TradeBatch:
+        """
+        Generate one day of trades, including corrections, from the day's own RNG stream.
+
+        With corrected_after (epoch microseconds) only the original/correction
+        pairs corrected after that time are returned: the ones a run ending
+        then had to leave out.
+        """
+        saved_rng = self.rng
+        self.rng = self._day_rng(day)
+        try:
+            # Generate daily trading activity as one batch
+            batch = self.generate_trades_batch(int(self.rng.integers(10, self.max_trades + 1)), day)
+            n = len(batch)
+
+            # Potentially generate corrections (drawn for the whole day up front,
+            # whatever the end date, so a trade is corrected the same way in a
+            # shorter or an extended run)
+            is_corrected = self.rng.random(n) < 0.1
+            correction_days = self.rng.integers(1, 3, n)
+            correction_ts = batch.ints["execution_timestamp"] + correction_days * DAY_US
+            rows = np.flatnonzero(is_corrected)
+            originals, corrections = self.generate_batch_corrections(batch, rows, correction_ts[rows])
+        finally:
+            self.rng = saved_rng
+
+        kept = correction_ts[rows] <= self._end_us
+        if corrected_after is not None:
+            late = np.flatnonzero(kept & (correction_ts[rows] > corrected_after))
+            pairs = np.argsort(np.concatenate([np.arange(len(late)) * 2, np.arange(len(late)) * 2 + 1]))
+            return TradeBatch.concat([originals.take(late), corrections.take(late)]).take(pairs)
+
+        kept = np.flatnonzero(kept)
+        rows, originals, corrections = rows[kept], originals.take(kept), corrections.take(kept)
+
+        # Put each original/correction pair straight after the trade it corrects
+        order = np.argsort(
+            np.concatenate([np.arange(n) * 3, rows * 3 + 1, rows * 3 + 2]), kind="stable"
+        )
+        return TradeBatch.concat([batch, originals, corrections]).take(order)
+
+    def _late_corrections(self) -> TradeBatch:
+        """
+        Original/correction pairs for trades before the checkpoint that were
+        corrected after its end date, so the run that wrote it left them out.
+        A correction comes at most three days after midnight of its trade's
+        day, so only the checkpoint's last three days are regenerated.
+        """
+        checkpoint_end = self._first_day - timedelta(days=1)
+        days = [checkpoint_end - timedelta(days=i) for i in (2, 1, 0)]
+        return TradeBatch.concat([
+            self._generate_day(day, corrected_after=to_epoch_us(checkpoint_end))
+            for day in days if day >= self.start_date
+        ])
+
+    def _iter_shard(
+        self,
+        days: List[datetime],
+        changes: List[Tuple[int, Dict[str, Any], Dict[str, Any]]],
+        scenarios: Optional[DayScenarios] = None
+    ) -> Iterator[Tuple[TradeBatch, Optional[TradeBatch]]]:
+        """
+        Generate a contiguous run of days, yielding (trades, scenario trades)
+        per day; the scenario trades are None without a scenarios builder.
+        Counterparty state is rebuilt from the initial versions plus the
+        planned changes, so the shard sees exactly the versions a serial run
+        would have at that point.
+        """
+        self.counterparties = self._initial_counterparties.copy()
+        pending = iter(changes)
+        change = next(pending, None)
+
+        # Catch up on everything that changed before this shard starts
+        while change and change[0] < days[0].toordinal():
+            self.counterparties.update(change[2])
+            change = next(pending, None)
+
+        for day in days:
+            trades = self._generate_day(day)
+            yield trades, scenarios(self, day) if scenarios else None
+
+            # Counterparty changes take effect after the day's trading
+            while change and change[0] == day.toordinal():
+                self.counterparties.update(change[2])
+                change = next(pending, None)
+
+    def iter_dataset(
+        self,
+        scenarios: Optional[DayScenarios] = None
+    ) -> Iterator[Tuple]:
+        """
+        Stream the dataset one day at a time.
+
+        Yields (day, trades, counterparty_versions) for every day in the range,
+        with the day's trades as a TradeBatch. With a scenarios builder
+        (see ScenarioScheduler) it yields (day, trades, counterparty_versions,
+        scenario_trades) instead, building each day's scenarios in the same
+        shard task as its trades, so they share the worker processes. A
+        generator restored with from_checkpoint() only yields the days after
+        the checkpoint, and its first day's trades start with the corrections
+        the checkpointed run left out (see _late_corrections()).
+        The first day's counterparty versions include the initial set; after that
+        only the (original, updated) pairs of changes made that day appear. Only a
+        handful of days are held in memory at once, so memory use stays flat no
+        matter how long the date range is.
+
+        With generation.workers > 1 the date range is split into contiguous day
+        shards that run in a process pool, with a bounded number of shards in
+        flight. Each day draws from its own seeded RNG stream, so the output is
+        identical whatever the worker count.
+        """
+        days = self.trading_days()
+        changes = self._plan_counterparty_changes(days)
+
+        changes_by_day: Dict[int, List[Dict[str, Any]]] = {}
+        for ordinal, original, updated in changes:
+            changes_by_day.setdefault(ordinal, []).extend([original, updated])
+
+        def with_counterparties(shard_days, daily_trades):
+            for day, (trades, scenario_trades) in zip(shard_days, daily_trades):
+                if day == days[0] and self._resumed:
+                    trades = TradeBatch.concat([self._late_corrections(), trades])
+                first_day = day == days[0] and not self._resumed
+                cp_versions = list(self._initial_counterparties) if first_day else []
+                cp_versions.extend(changes_by_day.get(day.toordinal(), []))
+                if scenarios:
+                    yield day, trades, cp_versions, scenario_trades
+                else:
+                    yield day, trades, cp_versions
+
+        if self.workers > 1 and len(days) > 1:
+            shards = _split_days(days, self.workers)
+            logger.info(f"Generating {len(days)} days in {len(shards)} shards on {self.workers} workers")
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_shard_worker,
+                initargs=(self,)
+            ) as pool:
+                # Keep at most two shards per worker in flight and yield in date order
+                in_flight = deque()
+                shard_iter = iter(shards)
+                for shard in islice(shard_iter, self.workers * 2):
+                    in_flight.append((shard, pool.submit(_run_shard, shard, changes, scenarios)))
+                while in_flight:
+                    shard, future = in_flight.popleft()
+                    daily_trades = future.result()
+                    next_shard = next(shard_iter, None)
+                    if next_shard:
+                        in_flight.append((next_shard, pool.submit(_run_shard, next_shard, changes, scenarios)))
+                    yield from with_counterparties(shard, daily_trades)
+        else:
+            yield from with_counterparties(days, self._iter_shard(days, changes, scenarios))
+
+        # Leave the generator holding the final counterparty versions
+        self.counterparties = self._initial_counterparties.copy()
+        for _, _, updated in changes:
+            self.counterparties.update(updated)
+        self._generated_through = self.end_date
+
+    def generate_dataset(self) -> Tuple[TradeBatch, List[Dict[str, Any]]]:
         """
         Generate complete datasets for trades and counterparties,
         ensuring timestamps are properly formatted for XTDB.
+
+        This collects iter_dataset() into one TradeBatch and a list of
+        counterparty versions; prefer iter_dataset() for long date ranges.
         """
+        trade_batches = []
         counterparty_documents = []
-        trade_documents = []
-        
-        # start with the initial set
-        counterparty_documents.extend(self.counterparties)
-        
-        current_date = self.start_date
-        while current_date <= self.end_date:
-            # Generate daily trading activity
-            for _ in range(random.randint(10, self.max_trades)):
-                trade_time = current_date + timedelta(minutes=random.randint(0, 1440))
-                trade = self.generate_trade(trade_time, is_suspicious=(random.random() < 0.15))
-                trade_documents.append(trade)
-                
-                # Potentially generate corrections
-                if random.random() < 0.1:
-                    correction_date = trade_time + timedelta(days=random.randint(1, 2))
-                    if correction_date <= self.end_date:
-                        original, correction = self.generate_trade_correction(trade, correction_date)
-                        trade_documents.extend([original, correction])
-            
-            # Potentially generate a counterparty change
-            if random.random() < 0.1:
-                cp = random.choice(self.counterparties)
-                original, updated = self.generate_counterparty_change(cp, current_date)
-                counterparty_documents.extend([original, updated])
-                self.counterparties.remove(cp)
-                self.counterparties.append(updated)
-            
-            current_date += timedelta(days=1)
-        
-        return trade_documents, counterparty_documents
+        for _, trades, cp_versions in self.iter_dataset():
+            trade_batches.append(trades)
+            counterparty_documents.extend(cp_versions)
+        return TradeBatch.concat(trade_batches), counterparty_documents
 
     def generate_counterparty_change(
         self,
         counterparty: Dict[str, Any],
-        change_date: datetime
+        change_date: Union[datetime, int]
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Generate changes to counterparty attributes with valid timestamps
-        recognized by XTDB.
+        Generate changes to counterparty attributes, with the validity bounds in
+        epoch microseconds (a datetime change_date is also accepted). The new
+        version replaces the old one in the counterparty registry straight away.
         """
+        change_ts = to_epoch_us(change_date)
+
         original_cp = counterparty.copy()
-        original_cp["_valid_to"] = change_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        original_cp["_valid_to"] = change_ts
         
         updated_cp = counterparty.copy()
         updated_cp.update({
-            "status": random.choice(["active", "suspended", "restricted"]),
-            "risk_rating": random.choice(["A", "B", "C", "D"]),
-            "trading_limit": counterparty["trading_limit"] * random.uniform(0.5, 1.5),
-            "_valid_from": change_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            "status": CP_STATUSES[self.rng.integers(len(CP_STATUSES))],
+            "risk_rating": CP_RISK_RATINGS[self.rng.integers(len(CP_RISK_RATINGS))],
+            "trading_limit": counterparty["trading_limit"] * self.rng.uniform(0.5, 1.5),
+            "_valid_from": change_ts,
             "_valid_to": None,
             "cp_update_sequence": counterparty.get("cp_update_sequence", 1) + 1
         })
+        self.counterparties.update(updated_cp)
         
         return original_cp, updated_cp
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        State needed to carry on generating after end_date: the current
+        counterparty versions, the RNG states and the last generated date.
+        Everything else (universe, price paths, per-day streams) is rebuilt
+        from the seed.
+
+        Raises:
+            ValueError: If iter_dataset() hasn't been run to the end yet
+        """
+        if self._generated_through is None:
+            raise ValueError("Nothing to checkpoint: the dataset hasn't been generated yet")
+        return {
+            "version": CHECKPOINT_VERSION,
+            "seed": self.seed_entropy,
+            "start_date": self.start_date.strftime('%Y-%m-%d'),
+            "last_date": self._generated_through.strftime('%Y-%m-%d'),
+            "num_counterparties": self.num_counterparties,
+            "counterparties": list(self.counterparties),
+            "rng": {
+                "counterparty_changes": self._cp_change_rng_end_state,
+                "trade_ids": self.trade_ids.rng.bit_generator.state
+            }
+        }
+
+    def save_checkpoint(self, file_path: str) -> None:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint(), f)
+        logger.info(f"Saved generator checkpoint through {self._generated_through:%Y-%m-%d} to {file_path}")
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        file_path: str,
+        end_date: str,
+        config: Dict[str, Any] = None
+    ) -> "BitemporalDataGenerator":
+        """
+        Restore a generator from save_checkpoint() so that iter_dataset()
+        generates only the days after the checkpoint, up to end_date.
+
+        The config must use the same seed and universe size as the run that
+        wrote the checkpoint (the original start_date is taken from the
+        checkpoint, since prices and the universe are anchored on it).
+
+        Raises:
+            ValueError: If the checkpoint doesn't match the config or end_date
+                        isn't after the checkpoint's last date
+        """
+        with open(file_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {file_path}")
+
+        generator = cls(state["start_date"], end_date, config)
+        if generator.seed_entropy != state["seed"]:
+            raise ValueError(
+                f"Checkpoint seed {state['seed']} doesn't match generation.seed {generator.seed_entropy}"
+            )
+        if generator.num_counterparties != state["num_counterparties"]:
+            raise ValueError("Checkpoint was written with a different num_counterparties")
+
+        last_date = datetime.strptime(state["last_date"], '%Y-%m-%d')
+        if generator.end_date <= last_date:
+            raise ValueError(f"Cannot extend to {end_date}: already generated through {state['last_date']}")
+
+        generator._first_day = last_date + timedelta(days=1)
+        generator._resumed = True
+        generator.counterparties = CounterpartyRegistry(state["counterparties"])
+        generator._initial_counterparties = generator.counterparties.copy()
+        generator._cp_change_rng_state = state["rng"]["counterparty_changes"]
+        generator._cp_change_rng_end_state = generator._cp_change_rng_state
+        generator.trade_ids.rng.bit_generator.state = state["rng"]["trade_ids"]
+        logger.info(f"Resuming from checkpoint {file_path}: generating {generator._first_day:%Y-%m-%d} to {end_date}")
+        return generator
+
+# Upper bound on days per shard, which bounds how much a streaming run holds in memory
+MAX_SHARD_DAYS = 7
+
+def _split_days(days: List[datetime], workers: int) -> List[List[datetime]]:
+    """Split the date range into contiguous shards, a few per worker for load balancing."""
+    num_shards = min(len(days), workers * 4)
+    shard_size = min(-(-len(days) // num_shards), MAX_SHARD_DAYS)
+    return [days[i:i + shard_size] for i in range(0, len(days), shard_size)]
+
+# Per-process copy of the generator, installed once by the pool initializer
+_shard_generator: Optional[BitemporalDataGenerator] = None
+
+def _init_shard_worker(generator: BitemporalDataGenerator) -> None:
+    global _shard_generator
+    _shard_generator = generator
+
+def _run_shard(
+    days: List[datetime],
+    changes: List[Tuple[int, Dict[str, Any], Dict[str, Any]]],
+    scenarios: Optional[DayScenarios] = None
+) -> List[Tuple[TradeBatch, Optional[TradeBatch]]]:
+    # Compacting drops the references to the full counterparty attribute lists,
+    # so only the categories a day actually uses are pickled back
+    return [
+        (trades.compact(), scenario_trades.compact() if scenario_trades is not None else None)
+        for trades, scenario_trades in _shard_generator._iter_shard(days, changes, scenarios)
+    ]
@@ -20,31 +20,28 @@
 import sys
 import asyncio
 import argparse
-import json
 import yaml
-from decimal import Decimal
-from datetime import datetime, timedelta
+from contextlib import ExitStack
+from datetime import datetime
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import TypeAlias, TypeVar, NotRequired, Dict, Any, List
+from typing import TypeAlias, TypeVar, NotRequired, Dict, Any, List, Optional, Union
 import logging
 
 # Local imports
 from generator import BitemporalDataGenerator
-from scenarios import (
-    generate_layering_scenario,
-    generate_wash_trading_scenario,
-    generate_spoofing_scenario,
-    #generate_momentum_ignition_scenario
-)
+from scenarios import get_scenario
 from queries import MANIPULATION_DETECTION_QUERIES
 from xtdb_inserter import XTDBInserter
+from timestamps import to_epoch_us
+from dataset_cache import DatasetCache, dataset_cache_key
+from external_sort import ExternalTradeSorter, DEFAULT_RUN_ROWS
+from scenario_scheduler import ScenarioScheduler
+from scenario_labels import ScenarioLabelWriter, DEFAULT_LABELS_FILE
+from trade_batch import TradeBatch
+from output_writers import JSONArrayWriter, BackgroundWriter, open_writer
+from sharded_output import open_trades_writer, shards_by_day, DEFAULT_SHARD_DIR
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return str(o)
-        return super().default(o)
+DEFAULT_CHECKPOINT_FILE = "generator_checkpoint.json"
 
 class TradeGenerationError(Exception):
     """
@@ -93,6 +90,13 @@ def parse_arguments() -> argparse.Namespace:
         default="config.yaml",
         help="Path to YAML configuration file"
     )
+    parser.add_argument(
+        "--extend-to",
+        type=str,
+        default=None,
+        metavar="YYYY-MM-DD",
+        help="Resume from the generator checkpoint and append days up to this date to the existing outputs"
+    )
     return parser.parse_args()
 
 def load_config(config_path: str) -> Dict[str, Any]:
@@ -176,13 +180,17 @@ def setup_output_directories(config: Dict[str, Any]) -> None:
     for file_path in [
         config["output"]["trades_file"],
         config["output"]["counterparties_file"],
-        config["output"]["sql_file"]
+        config["output"]["sql_file"],
+        config["output"].get("checkpoint_file", DEFAULT_CHECKPOINT_FILE),
+        config["output"].get("labels_file", DEFAULT_LABELS_FILE)
     ]:
         output_dir = Path(file_path).parent
         output_dir.mkdir(parents=True, exist_ok=True)
+    if config["output"].get("shard_by", "none") != "none":
+        Path(config["output"].get("shard_dir", DEFAULT_SHARD_DIR)).mkdir(parents=True, exist_ok=True)
 
 async def process_database_operations(
-    trades: List[Dict[str, Any]],
+    trades: Union[TradeBatch, List[Dict[str, Any]]],
     counterparties: List[Dict[str, Any]],
     config: Dict[str, Any]
 ) -> Dict[str, Any]:
@@ -190,7 +198,7 @@ async def process_database_operations(
     Process all database operations within a single async context.
     
     Args:
-        trades: List of trade documents
+        trades: TradeBatch or list of trade documents
         counterparties: List of counterparty documents
         config: Configuration dictionary
         
@@ -239,6 +247,146 @@ async def prompt_user(question: str) -> str:
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(None, input, question)
 
+def write_scenarios(
+    trades_writer: Union[JSONArrayWriter, BackgroundWriter, ExternalTradeSorter],
+    generator: BitemporalDataGenerator,
+    config: Dict[str, Any],
+    labels_writer: Optional[ScenarioLabelWriter] = None
+) -> None:
+    """
+    Append the manipulation scenarios enabled in scenario_toggles to the trades
+    output, and their labels to labels_writer if given.
+    """
+    logger.info("Phase II : Market manipulation!")
+    # choice = await prompt_user("Base files generated. Start market manipulation? [Y/N] :")
+    # if choice.lower() != 'y':
+    #     print("Exiting by request ...")
+    #     return
+
+    # Apply market manipulation scenarios, appended to the trades file
+
+    logger.info("Applying manipulation scenarios...")
+    # Anchored on the last generated day and drawn from that day's seeded
+    # streams, so a seeded run places the same scenarios every time
+    scenario_day = generator.end_date
+    base_time = to_epoch_us(scenario_day)
+
+    with generator.scenario_streams(scenario_day, one_off=True) as rand:
+        for name, enabled in config["scenario_toggles"].items():
+            if not enabled:
+                continue
+            pattern = get_scenario(name)
+            logger.info(f"Generating {name.replace('_', ' ')} scenario...")
+            scenario_trades = pattern(generator, base_time + pattern.start_offset_us, rand=rand)
+            trades_writer.write(scenario_trades)
+            if labels_writer:
+                labels_writer.write(scenario_trades)
+
+def generate_output_files(config: Dict[str, Any], extend_to: Optional[str] = None) -> bool:
+    """
+    Generate the base dataset and the enabled manipulation scenarios, streaming
+    them into the trades and counterparties output files and the scenario
+    trades' labels into the labels file, then save a generator checkpoint.
+
+    With extend_to, the generator resumes from that checkpoint instead and
+    only the days after it (no new scenarios) are appended to the outputs,
+    along with corrections to earlier trades that fall in those days.
+    
+    Args:
+        config: Configuration dictionary
+        extend_to: New end date, YYYY-MM-DD, for an append run
+        
+    Returns:
+        True if both files were written completely
+        
+    Raises:
+        TradeGenerationError: If no trades were generated
+        CounterpartyGenerationError: If no counterparties were generated
+    """
+    checkpoint_file = config["output"].get("checkpoint_file", DEFAULT_CHECKPOINT_FILE)
+
+    # Generate synthetic data
+    logger.info("Initializing data generator...")
+    if extend_to:
+        generator = BitemporalDataGenerator.from_checkpoint(checkpoint_file, extend_to, config)
+    else:
+        generator = BitemporalDataGenerator(
+            start_date=config["date_range"]["start_date"],
+            end_date=config["date_range"]["end_date"],
+            config=config
+        )
+    append = extend_to is not None
+    
+    logger.info("Generating base dataset...")
+    try:
+        with open_trades_writer(config["output"], generator.price_scale, append) as trades_writer, \
+             open_writer(config["output"]["counterparties_file"], config["output"], append=append, record_type="counterparty") as counterparties_writer, \
+             ScenarioLabelWriter(config["output"].get("labels_file", DEFAULT_LABELS_FILE), append) as labels_writer, \
+             ExitStack() as stack:
+
+            # Trades go through the external sort when time-ordered output is
+            # on, and always for day shards, which are filled one day at a time.
+            # Its spilled runs are removed however the block exits.
+            trades_out = trades_writer
+            if config["output"].get("sort_by_valid_from") or shards_by_day(config["output"]):
+                trades_out = stack.enter_context(ExternalTradeSorter(
+                    config["output"].get("sort_run_rows", DEFAULT_RUN_ROWS),
+                    tmp_dir=str(Path(config["output"]["trades_file"]).parent)
+                ))
+
+            # Scheduled scenarios are built alongside the base trades and
+            # written right after their day's trades
+            scheduler = ScenarioScheduler.from_config(generator, config)
+            days = scheduler.iter_dataset() if scheduler else generator.iter_dataset()
+
+            # Stream day by day straight into the output files
+            for day, day_trades, day_counterparties, *scheduled in days:
+                trades_out.write(day_trades)
+                counterparties_writer.write(day_counterparties)
+                if scheduled:
+                    day_scenarios = scheduled[0]
+                    trades_out.write(day_scenarios)
+                    labels_writer.write(day_scenarios)
+                    logger.info(f"Injected {len(day_scenarios)} scheduled scenario trades on {day.date()}")
+
+            # Length checks on the streamed trades dataset
+            if trades_out.count == 0:
+                logger.error("Trade generation failed - received 0 trades in collection")
+                raise TradeGenerationError("Trade generation failed - received 0 items in trade collection")
+            else:
+                # Spit out the count
+                logger.info(f"Successful trade gen! Number of trades generated : {trades_out.count}")
+
+            # Same with counterparties (an append run only adds the days' changes, if any)
+            if counterparties_writer.count == 0 and not append:
+                logger.error("Counterparty generation failed - received 0 counterparties in collection")
+                raise CounterpartyGenerationError("Counterparty generation failed - received 0 items in counterparties collection")
+            else:
+                # Spit out the count
+                logger.info(f"Successful counterparty gen! Number of counterparties generated : {counterparties_writer.count}")
+
+            if append:
+                logger.info("Extending an existing dataset, scenarios were generated with it")
+            else:
+                write_scenarios(trades_out, generator, config, labels_writer)
+
+            if trades_out is not trades_writer:
+                logger.info("Writing trades in _valid_from order...")
+                for sorted_trades in trades_out.sorted_batches():
+                    trades_writer.write(sorted_trades)
+
+    except TypeError as e:
+        # JSON serialization err from not being able to serialize a value to JSON natively
+        logger.error(f"JSON serialization error while writing output files: {e}")
+        raise
+    except (FileNotFoundError, PermissionError) as e:
+        logger.error(f"File writing error: {e}")
+        return False
+
+    # Written once the outputs are complete, so it always matches them
+    generator.save_checkpoint(checkpoint_file)
+    return True
+
 async def main() -> None:
     """
     Main execution function coordinating data generation and analysis.
@@ -257,95 +405,31 @@ async def main() -> None:
         validate_config(config)
         setup_output_directories(config)
         
-        # Generate synthetic data
-        logger.info("Initializing data generator...")
-        generator = BitemporalDataGenerator(
-            start_date=config["date_range"]["start_date"],
-            end_date=config["date_range"]["end_date"],
-            config=config
-        )
-        
-        logger.info("Generating base dataset...")
-        trades, counterparties = generator.generate_dataset()
-        
-        # Some basic error checks to see if the data was generated at all
-        logger.info(f"Generated trades: {'NOT NULL' if trades is not None else 'NULL'}")
-        
-        # Error and Length checks on returned trades dataset
-        if trades is None:
-            logger.error("Trades collection is None")
-            raise TradeGenerationError("Trade generation failed - received None instead of trade collection")
-        elif len(trades) == 0:
-            logger.error("Trade generation failed - received 0 trades in collection")
-            raise TradeGenerationError("Trade generation failed - received 0 items in trade collection")
-        else:
-            # Spit out the count
-            logger.info(f"Successful trade gen! Number of trades generated : {len(trades)}")
+        # Reuse the files from an earlier run with the same effective config and seed
+        cache = DatasetCache.from_config(config)
+        cache_key = dataset_cache_key(config) if cache else None
+        output_files = {
+            # With sharded output the trades artifact is the shard directory
+            "trades": (
+                config["output"]["trades_file"] if config["output"].get("shard_by", "none") == "none"
+                else config["output"].get("shard_dir", DEFAULT_SHARD_DIR)
+            ),
+            "counterparties": config["output"]["counterparties_file"],
+            "checkpoint": config["output"].get("checkpoint_file", DEFAULT_CHECKPOINT_FILE),
+            "labels": config["output"].get("labels_file", DEFAULT_LABELS_FILE)
+        }
+        if cache and not cache_key:
+            logger.info("Dataset cache skipped: generation.seed is not set")
 
-        # Same with counterparties
-        logger.info(f"Generated counterparties: {'NOT NULL' if counterparties is not None else 'NULL'}")
-        
-        # Error and Length checks on returned CP dataset
-        if counterparties is None:
-            logger.error("counterparties collection is None")
-            raise CounterpartyGenerationError("Counterparty generation failed - received None instead of counterparties collection")
-        elif len(counterparties) == 0:
-            logger.error("Counterparty generation failed - received 0 counterparties in collection")
-            raise CounterpartyGenerationError("Counterparty generation failed - received 0 items in counterparties collection")
+        if args.extend_to:
+            # Appends to the existing outputs; the result isn't keyed on the config alone
+            generate_output_files(config, args.extend_to)
+        elif cache_key and cache.restore(cache_key, output_files):
+            logger.info("Skipping generation, using cached dataset")
         else:
-            # Spit out the count
-            logger.info(f"Successful counterparty gen! Number of counterparties generated : {len(counterparties)}")
+            if generate_output_files(config) and cache_key:
+                cache.store(cache_key, output_files)
 
-
-        logger.info("Phase II : Market manipulation!")
-        # choice = await prompt_user("Base files generated. Start market manipulation? [Y/N] :")
-        # if choice.lower() != 'y':
-        #     print("Exiting by request ...")
-        #     return
-
-        # Apply market manipulation scenarios
-
-        logger.info("Applying manipulation scenarios...")
-        base_time = datetime.now(timezone.utc)
-        
-        if config["scenario_toggles"]["layering"]:
-            logger.info("Generating layering scenario...")
-            trades.extend(generate_layering_scenario(generator, base_time))
-            
-        if config["scenario_toggles"]["wash_trading"]:
-            logger.info("Generating wash trading scenario...")
-            trades.extend(
-                generate_wash_trading_scenario(
-                    generator,
-                    base_time + timedelta(minutes=30)
-                )
-            )
-            
-        if config["scenario_toggles"]["spoofing"]:
-            logger.info("Generating spoofing scenario...")
-            trades.extend(
-                generate_spoofing_scenario(
-                    generator,
-                    base_time + timedelta(hours=1)
-                )
-            )
-        
-        # Write output files
-        logger.info("Writing output files...")
-        for file_path, data in [
-            (config["output"]["trades_file"], trades),
-            (config["output"]["counterparties_file"], counterparties)
-        ]:
-           try:
-               # JSON serialization err from not being able to serialize Decimal to JSON natively
-               json_data = json.dumps(data, indent=4, cls=DecimalEncoder)
-               Path (file_path).write_text(json_data, encoding='utf-8')
-           except (TypeError, json.JSONDecodeError) as e:
-               logger.error(f"JSON serialization error for {file_path}: {e}")
-               raise
-           except (FileNotFoundError, PermissionError) as e:
-               logger.error(f"File writing error for {file_path}: {e}")
-        
         logger.info("All files generated. Phase II complete!")
         logger.info("Phase III : XTDB Database Insert ...")
         choice = await prompt_user("Continue? [Y/N] :")
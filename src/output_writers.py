@@ -0,0 +1,360 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : output_writers.py
+# Description      : Streaming writers for the trades and counterparties
+# output files, and a background thread that overlaps writing with
+# generation.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# output_writers.py
+
+import gzip
+import io
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # Only needed for output.stream_compression: zstd
+    zstandard = None
+
+from pricing import TickScale
+from timestamps import render_timestamps
+from trade_batch import TradeBatch
+from arrow_io import ArrowWriter, ARROW_FORMATS
+from serializers import get_serializer, DEFAULT_SERIALIZER
+
+logger = logging.getLogger(__name__)
+
+# "json": one top-level array. "ndjson": one compact record per line, so
+# files can be appended to, tailed and split by byte range. "parquet" and
+# "arrow" (IPC file): typed columnar files, see arrow_io.py.
+OUTPUT_FORMATS = ("json", "ndjson") + ARROW_FORMATS
+DEFAULT_OUTPUT_FORMAT = "json"
+
+# Bytes buffered by the output file handle between writes to disk
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+# Indent of the JSON array layout; None writes compact records, one per line
+DEFAULT_JSON_INDENT = 4
+# Chunks queued for the background writer before write() blocks
+DEFAULT_MAX_PENDING = 8
+
+# Whole-file compression of json and ndjson output, applied as it streams
+STREAM_COMPRESSIONS = ("none", "gzip", "zstd")
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def open_output(
+    file_path: str,
+    compression: Optional[str] = None,
+    append: bool = False,
+    buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> BinaryIO:
+    """
+    A binary file handle for writing output, compressing as it goes with
+    gzip or zstd if asked.
+
+    Raises:
+        ValueError: If compression is unknown, or asked to append to an
+            existing file (a compressed file can't be reopened and edited)
+        ImportError: If zstd is asked for and zstandard isn't installed
+    """
+    compression = compression or "none"
+    if compression not in STREAM_COMPRESSIONS:
+        raise ValueError(f"Unknown stream compression {compression!r}; expected one of {STREAM_COMPRESSIONS}")
+    if compression == "none":
+        return open(file_path, "ab" if append else "wb", buffering=buffer_size)
+    if append and Path(file_path).is_file():
+        raise ValueError(f"Can't append to compressed file {file_path}; turn stream_compression off to extend a dataset")
+    if compression == "gzip":
+        return io.BufferedWriter(gzip.open(file_path, "wb", compresslevel=GZIP_LEVEL), buffer_size)
+    if zstandard is None:
+        raise ImportError("zstd stream compression needs zstandard: pip install zstandard")
+    return io.BufferedWriter(
+        zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(file_path, "wb")),
+        buffer_size
+    )
+
+def open_input(file_path: str) -> BinaryIO:
+    """
+    A binary file handle for reading an output file, transparently
+    decompressing gzip or zstd files (recognised by their magic bytes).
+    """
+    with open(file_path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(file_path, "rb")
+    if magic == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise ImportError(f"{file_path} is zstd compressed; reading it needs zstandard: pip install zstandard")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb")))
+    return open(file_path, "rb")
+
+class JSONArrayWriter:
+    """
+    Writes a top-level JSON array one chunk of records at a time, so the whole
+    dataset never has to be held in memory. With the default indent of 4 the
+    layout matches what json.dumps(data, indent=4) produces for the full list;
+    indent=None writes each record compactly on its own line, which roughly
+    halves the file. Either way the file is one JSON array, as
+    XTDBInserter.stream_json_data() expects. Epoch-microsecond timestamps and
+    integer-tick prices are rendered as ISO strings and decimal strings here,
+    on the way out.
+
+    Records are encoded by the configured serializer backend (see
+    serializers.py) and each chunk is joined into a single bytes string and
+    handed to a buffered file handle in one write.
+
+    With append=True an existing array is reopened and new records go after
+    the ones already in it. compression ("gzip" or "zstd") compresses the
+    file as it is written; compressed files can't be appended to.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        price_scale: Optional[TickScale] = None,
+        append: bool = False,
+        indent: Optional[int] = DEFAULT_JSON_INDENT,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        serializer: str = DEFAULT_SERIALIZER,
+        compression: Optional[str] = None
+    ):
+        self.file_path = file_path
+        self.price_scale = price_scale or TickScale()
+        self.indent = indent
+        self.count = 0
+        self.serializer = get_serializer(serializer, indent)
+        self._needs_separator = False
+        if indent is None:
+            self._record_prefix = b"\n"
+        else:
+            self._record_prefix = b"\n" + b" " * indent
+        if append and Path(file_path).is_file() and compression in (None, "none"):
+            self._needs_separator = self._reopen_array()
+            self._file = open_output(file_path, compression, True, buffer_size)
+        else:
+            self._file = open_output(file_path, compression, append, buffer_size)
+            self._file.write(b"[")
+
+    def _reopen_array(self) -> bool:
+        """
+        Cut the closing bracket (and the whitespace before it) off an existing
+        array so records can be appended.
+
+        Returns:
+            True if the array already holds records
+        """
+        with open(self.file_path, "rb+") as f:
+            # The closing bracket is in the last few bytes
+            f.seek(0, 2)
+            tail_start = max(0, f.tell() - 64)
+            f.seek(tail_start)
+            tail = f.read()
+            close_at = tail.rfind(b"]")
+            if close_at < 0 or tail[close_at + 1:].strip():
+                raise ValueError(f"{self.file_path} does not end with a JSON array")
+            content = tail[:close_at].rstrip()
+            f.truncate(tail_start + len(content))
+        return tail_start > 0 or content.strip() != b"["
+
+    def write(self, records: Union[TradeBatch, List[Dict[str, Any]]]) -> None:
+        if isinstance(records, TradeBatch):
+            records = records.iter_records()
+        encode = self.serializer.dumps
+        render = self.price_scale.render
+        prefix = self._record_prefix
+        nested = self.indent is not None
+        parts = []
+        for record in records:
+            body = encode(render(render_timestamps(record)))
+            if nested:
+                # Indent each record one level, as it would be inside the array
+                body = body.replace(b"\n", prefix)
+            parts.append((b"," if self.count or self._needs_separator else b"") + prefix + body)
+            self.count += 1
+        if parts:
+            self._file.write(b"".join(parts))
+
+    def close(self) -> None:
+        self._file.write(b"\n]" if self.count or self._needs_separator else b"]")
+        self._file.close()
+
+    def __enter__(self) -> "JSONArrayWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class NDJSONWriter:
+    """
+    Writes newline-delimited JSON: one compact record per line, rendered the
+    same way as JSONArrayWriter's records.
+
+    With append=True records go after an existing file's lines. A partial
+    last line left by an interrupted run is cut off first, so the file stays
+    readable line by line. compression ("gzip" or "zstd") compresses the
+    file as it is written; compressed files can't be appended to.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        price_scale: Optional[TickScale] = None,
+        append: bool = False,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        serializer: str = DEFAULT_SERIALIZER,
+        compression: Optional[str] = None
+    ):
+        self.file_path = file_path
+        self.price_scale = price_scale or TickScale()
+        self.count = 0
+        self.serializer = get_serializer(serializer)
+        if append and Path(file_path).is_file() and compression in (None, "none"):
+            self._drop_partial_line()
+        self._file = open_output(file_path, compression, append, buffer_size)
+
+    def _drop_partial_line(self) -> None:
+        with open(self.file_path, "rb+") as f:
+            f.seek(0, 2)
+            size = f.tell()
+            end = size
+            # Walk back to the last newline
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                logger.warning(f"Dropping a partial last line ({size - end} bytes) from {self.file_path}")
+                f.truncate(end)
+
+    def write(self, records: Union[TradeBatch, List[Dict[str, Any]]]) -> None:
+        if isinstance(records, TradeBatch):
+            records = records.iter_records()
+        encode = self.serializer.dumps
+        render = self.price_scale.render
+        lines = [encode(render(render_timestamps(record))) for record in records]
+        if lines:
+            self._file.write(b"\n".join(lines) + b"\n")
+            self.count += len(lines)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class BackgroundWriter:
+    """
+    Runs another writer's write() calls on a thread, so encoding and disk
+    I/O overlap with generating the next chunk. Chunks go through a bounded
+    queue: once max_pending chunks are waiting, write() blocks until the
+    thread catches up, which keeps memory bounded.
+
+    count is the number of records handed to write(). An error on the writer
+    thread is raised again from the next write() or from close().
+    """
+    def __init__(self, writer: Any, max_pending: int = DEFAULT_MAX_PENDING):
+        self.writer = writer
+        self.count = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._drain, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        while True:
+            records = self._queue.get()
+            if records is None:
+                return
+            if self._error is None:
+                try:
+                    self.writer.write(records)
+                except BaseException as e:
+                    logger.error(f"Background write failed: {e}")
+                    self._error = e
+
+    def _raise_pending_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def write(self, records: Union[TradeBatch, List[Dict[str, Any]]]) -> None:
+        self._raise_pending_error()
+        self.count += len(records)
+        self._queue.put(records)
+
+    def close(self) -> None:
+        """Wait for the queued chunks, then close the wrapped writer."""
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.close()
+        self._raise_pending_error()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def open_writer(
+    file_path: str,
+    output_config: Dict[str, Any],
+    price_scale: Optional[TickScale] = None,
+    append: bool = False,
+    record_type: str = "trade"
+) -> Union[JSONArrayWriter, NDJSONWriter, ArrowWriter, BackgroundWriter]:
+    """
+    The writer for one output file as configured under output: (format,
+    json_indent, serializer, compression, stream_compression,
+    write_buffer_bytes and background_writer).
+    record_type ("trade" or "counterparty") picks the columnar schema.
+
+    Raises:
+        ValueError: If output.format is not one of OUTPUT_FORMATS
+    """
+    output_format = output_config.get("format", DEFAULT_OUTPUT_FORMAT)
+    buffer_size = output_config.get("write_buffer_bytes", DEFAULT_BUFFER_SIZE)
+    serializer = output_config.get("serializer", DEFAULT_SERIALIZER)
+    stream_compression = output_config.get("stream_compression", "none")
+    if output_format == "json":
+        writer = JSONArrayWriter(
+            file_path,
+            price_scale,
+            append,
+            indent=output_config.get("json_indent", DEFAULT_JSON_INDENT),
+            buffer_size=buffer_size,
+            serializer=serializer,
+            compression=stream_compression
+        )
+    elif output_format == "ndjson":
+        writer = NDJSONWriter(file_path, price_scale, append, buffer_size, serializer, stream_compression)
+    elif output_format in ARROW_FORMATS:
+        writer = ArrowWriter(
+            file_path,
+            price_scale,
+            append,
+            output_format,
+            record_type,
+            output_config.get("compression", "zstd")
+        )
+    else:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {OUTPUT_FORMATS}")
+    if output_config.get("background_writer"):
+        return BackgroundWriter(writer)
+    return writer
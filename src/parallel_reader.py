@@ -0,0 +1,188 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : parallel_reader.py
+# Description      : Memory-mapped reader that splits a JSON or NDJSON
+# output file into record-aligned byte ranges and parses them in a process
+# pool, delivering the records in file order or as ranges finish.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# parallel_reader.py
+#
+# Record boundaries come from the layout the output writers produce: in
+# NDJSON every record ends at a newline, and in a JSON array every record
+# starts on a new line at the array's indent ("\n    {" with json_indent 4,
+# "\n{" compact). Nested objects sit deeper, so that marker only ever
+# matches a top-level record. Compressed files can't be split and are left
+# to the sequential readers.
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes per parsed range; each range is one task in the pool
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+
+_COMPRESSED_MAGIC = (b"\x1f\x8b", b"\x28\xb5\x2f\xfd")
+
+def is_splittable(file_path: str) -> bool:
+    """True for an uncompressed, non-empty JSON or NDJSON file."""
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+    return bool(head) and not any(head.startswith(magic) for magic in _COMPRESSED_MAGIC)
+
+def record_marker(data: mmap.mmap) -> Optional[bytes]:
+    """
+    The bytes every record starts with in a JSON array file ("\\n" plus the
+    indent plus "{"), b"\\n" for NDJSON, or None for an empty array.
+    """
+    start = 0
+    while start < len(data) and data[start:start + 1].isspace():
+        start += 1
+    if data[start:start + 1] != b"[":
+        return b"\n"
+    brace = data.find(b"{", start)
+    if brace < 0:
+        return None
+    newline = data.rfind(b"\n", start, brace)
+    if newline < 0:
+        raise ValueError("JSON array records must each start on a new line, as the output writers write them")
+    return data[newline:brace + 1]
+
+def _range_bounds(data: mmap.mmap, marker: bytes, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Split the file into ranges of about chunk_bytes that start at a record."""
+    size = len(data)
+    # NDJSON ranges start just after a newline, JSON array ranges at the marker
+    offset = 1 if marker == b"\n" else 0
+    first = 0 if marker == b"\n" else data.find(marker)
+    bounds = []
+    start = first
+    while start < size:
+        found = data.find(marker, min(start + chunk_bytes, size))
+        end = size if found < 0 else found + offset
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def _parse_ndjson(chunk: bytes, is_last: bool, file_path: str) -> List[Dict[str, Any]]:
+    lines = [line for line in chunk.split(b"\n") if line.strip()]
+    if not lines:
+        return []
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]", parse_float=Decimal)
+    except json.JSONDecodeError:
+        pass
+    # Find the bad line; only a partial final line of the file is tolerated
+    records = []
+    for i, line in enumerate(lines):
+        try:
+            records.append(json.loads(line, parse_float=Decimal))
+        except json.JSONDecodeError:
+            if is_last and i == len(lines) - 1 and not chunk.endswith(b"\n"):
+                logger.warning(f"Skipping truncated last line of {file_path}")
+                break
+            raise ValueError(f"Malformed JSON line in {file_path}")
+    return records
+
+def _parse_json_array(chunk: bytes, is_last: bool) -> List[Dict[str, Any]]:
+    body = chunk.strip()
+    if is_last:
+        # The closing bracket of the array
+        body = body[:-1].rstrip() if body.endswith(b"]") else body
+    body = body.rstrip(b",")
+    if not body:
+        return []
+    return json.loads(b"[" + body + b"]", parse_float=Decimal)
+
+def _parse_range(file_path: str, start: int, end: int, marker: bytes, is_last: bool) -> List[Dict[str, Any]]:
+    """Parse the records in bytes [start, end) of the file (runs in a worker)."""
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk = data[start:end]
+    if marker == b"\n":
+        return _parse_ndjson(chunk, is_last, file_path)
+    return _parse_json_array(chunk, is_last)
+
+class ParallelRecordReader:
+    """
+    Parses an uncompressed JSON array or NDJSON output file on a pool of
+    worker processes. The file is memory-mapped to find record-aligned
+    ranges of about chunk_bytes; each worker maps the file itself and parses
+    its range with one json.loads() call (numbers with a fraction come back
+    as Decimal, as they do from ijson).
+
+    Iterating yields one list of records per range. With ordered=True the
+    ranges come back in file order; with ordered=False each range is
+    delivered as soon as it's parsed. At most workers * 2 ranges are in
+    flight, which bounds memory whatever the file size.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        workers: int = os.cpu_count() or 1,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        ordered: bool = True
+    ):
+        self.file_path = file_path
+        self.workers = max(1, workers)
+        self.chunk_bytes = chunk_bytes
+        self.ordered = ordered
+        with open(file_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.marker = record_marker(data)
+                self.ranges = _range_bounds(data, self.marker, chunk_bytes) if self.marker else []
+        logger.info(f"Reading {file_path} as {len(self.ranges)} ranges on {self.workers} workers")
+
+    def _submit_all(self, pool: ProcessPoolExecutor) -> Iterator[Future]:
+        last = len(self.ranges) - 1
+        for i, (start, end) in enumerate(self.ranges):
+            yield pool.submit(_parse_range, self.file_path, start, end, self.marker, i == last)
+
+    def __iter__(self) -> Iterator[List[Dict[str, Any]]]:
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            submissions = self._submit_all(pool)
+            pending = deque(islice(submissions, self.workers * 2))
+            try:
+                while pending:
+                    if self.ordered:
+                        done = pending.popleft()
+                    else:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        done = finished.pop()
+                        pending.remove(done)
+                    # Keep the window full
+                    pending.extend(islice(submissions, 1))
+                    yield done.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    async def iter_async(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """As iterating, but awaits the workers instead of blocking the event loop."""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            submissions = (asyncio.wrap_future(f) for f in self._submit_all(pool))
+            pending = deque(islice(submissions, self.workers * 2))
+            try:
+                while pending:
+                    if self.ordered:
+                        done = pending.popleft()
+                    else:
+                        finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        done = finished.pop()
+                        pending.remove(done)
+                    pending.extend(islice(submissions, 1))
+                    yield await done
+            finally:
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,145 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : price_paths.py
+# Description      : Per-security intraday price paths (geometric Brownian
+# motion on a one-minute grid), generated once per day and cached, so
+# every trade prices off the prevailing market in O(1).
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# price_paths.py
+
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Union
+
+import numpy as np
+
+from pricing import TickScale
+from timestamps import to_epoch_us, MINUTE_US, DAY_US
+
+# One path point per minute of the day, both midnights included
+MINUTES_PER_DAY = 1440
+PATH_POINTS = MINUTES_PER_DAY + 1
+
+# Number of daily paths kept in memory
+DEFAULT_CACHE_DAYS = 32
+
+class PricePathEngine:
+    """
+    Simulates one intraday price path per security per day.
+
+    Prices follow a driftless geometric Brownian motion with each security's
+    configured volatility read as a daily volatility. Days are generated
+    independently of each other so that day shards can run in any order or
+    process:
+
+    - Each day's open-to-close log return comes from that day's own seeded
+      stream; a day's open is the start price compounded by every earlier
+      day's return, so closes carry over to the next day's open.
+    - The intraday path is a Brownian bridge between that open and close on
+      a one-minute grid, drawn from the same stream.
+
+    Paths are held as integer ticks in an LRU cache of recent days.
+    """
+    def __init__(
+        self,
+        base_prices: np.ndarray,
+        volatilities: np.ndarray,
+        price_scale: TickScale,
+        seed_entropy: int,
+        stream: int,
+        start_date: Union[datetime, date],
+        cache_days: int = DEFAULT_CACHE_DAYS
+    ):
+        self.price_scale = price_scale
+        self.seed_entropy = seed_entropy
+        self.stream = stream
+        self.cache_days = cache_days
+        self._log_base = np.log(np.asarray(base_prices, dtype=np.float64))
+        self._volatilities = np.asarray(volatilities, dtype=np.float64)
+        self._start_ordinal = start_date.toordinal()
+
+        # Cumulative log return from the start date to each day's open, grown on demand
+        self._open_offsets = np.zeros((1, len(self._log_base)))
+        self._paths: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+    def _day_rng(self, day_index: int) -> np.random.Generator:
+        return np.random.default_rng(
+            np.random.SeedSequence(self.seed_entropy, spawn_key=(self.stream, day_index))
+        )
+
+    def _daily_return(self, rng: np.random.Generator) -> np.ndarray:
+        # Always the first draw from the day's stream
+        sigma = self._volatilities
+        return sigma * rng.standard_normal(len(sigma)) - 0.5 * sigma ** 2
+
+    def _open_offset(self, day_index: int) -> np.ndarray:
+        known = len(self._open_offsets)
+        if day_index >= known:
+            returns = np.array([
+                self._daily_return(self._day_rng(k)) for k in range(known - 1, day_index)
+            ])
+            self._open_offsets = np.vstack(
+                [self._open_offsets, self._open_offsets[-1] + np.cumsum(returns, axis=0)]
+            )
+        return self._open_offsets[day_index]
+
+    def day_path(self, day: Union[datetime, date, int]) -> np.ndarray:
+        """
+        The (securities x 1441) path of prices in ticks for a day, one column
+        per minute from midnight to midnight. Days before the start date use
+        the start date's path.
+        """
+        if isinstance(day, int):
+            day_index = day // DAY_US - (self._start_ordinal - date(1970, 1, 1).toordinal())
+        else:
+            day_index = day.toordinal() - self._start_ordinal
+        day_index = max(day_index, 0)
+
+        path = self._paths.get(day_index)
+        if path is not None:
+            self._paths.move_to_end(day_index)
+            return path
+
+        rng = self._day_rng(day_index)
+        daily_return = self._daily_return(rng)
+        sigma_minute = self._volatilities[:, None] / np.sqrt(MINUTES_PER_DAY)
+
+        # Brownian bridge pinned to 0 at both ends, then the straight line
+        # from the open to the close log price laid on top of it
+        walk = np.zeros((len(self._log_base), PATH_POINTS))
+        walk[:, 1:] = np.cumsum(
+            sigma_minute * rng.standard_normal((len(self._log_base), MINUTES_PER_DAY)), axis=1
+        )
+        fraction = np.arange(PATH_POINTS) / MINUTES_PER_DAY
+        bridge = walk - fraction * walk[:, -1:]
+
+        log_open = self._log_base + self._open_offset(day_index)
+        log_path = log_open[:, None] + fraction * daily_return[:, None] + bridge
+        path = np.maximum(self.price_scale.to_ticks_array(np.exp(log_path)), 1)
+
+        self._paths[day_index] = path
+        if len(self._paths) > self.cache_days:
+            self._paths.popitem(last=False)
+        return path
+
+    def prices(
+        self,
+        day: Union[datetime, date, int],
+        security: np.ndarray,
+        minute: np.ndarray
+    ) -> np.ndarray:
+        """
+        Path prices, in ticks, for trades in the given securities (indexes)
+        at the given minutes (0-1440) of one day.
+        """
+        return self.day_path(day)[security, minute]
+
+    def price_at(self, security: int, timestamp: Union[datetime, int]) -> int:
+        """Path price, in ticks, of one security at one moment."""
+        timestamp = to_epoch_us(timestamp)
+        day_start = timestamp // DAY_US * DAY_US
+        return int(self.day_path(day_start)[security, (timestamp - day_start) // MINUTE_US])
@@ -0,0 +1,78 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : pricing.py
+# Description      : Fixed-point integer prices. The generator and scenarios
+# work in integer ticks; prices only become decimals when they are written
+# out or bound to the database.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# pricing.py
+
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, Dict, Union
+
+import numpy as np
+
+DEFAULT_TICK_SIZE = "0.01"
+
+# Record fields holding prices in ticks
+PRICE_FIELDS = ("price",)
+
+class TickScale:
+    """
+    Converts between prices and integer ticks for one tick size.
+
+    A tick size that is a power of ten (0.01, 0.001, ...) formats with plain
+    integer arithmetic; any other tick size (e.g. 0.05) goes through Decimal.
+    """
+    def __init__(self, tick_size: Union[str, float, Decimal] = DEFAULT_TICK_SIZE):
+        # str() first so a YAML float like 0.01 doesn't pick up binary noise
+        self.tick_size = Decimal(str(tick_size))
+        if self.tick_size <= 0:
+            raise ValueError(f"Tick size must be positive, got {tick_size}")
+        self._tick_float = float(self.tick_size)
+
+        # Number of decimal places if the tick is 10^-k, else None
+        sign, digits, exponent = self.tick_size.normalize().as_tuple()
+        self._decimals = -exponent if digits == (1,) and exponent <= 0 else None
+
+    def to_ticks(self, price: Union[str, float, Decimal]) -> int:
+        """Round a price to the nearest whole tick."""
+        return int((Decimal(str(price)) / self.tick_size).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+    def to_ticks_array(self, prices: np.ndarray) -> np.ndarray:
+        """Vectorised to_ticks() for float prices."""
+        return np.rint(prices / self._tick_float).astype(np.int64)
+
+    def to_float_array(self, ticks: np.ndarray) -> np.ndarray:
+        return ticks * self._tick_float
+
+    def to_decimal(self, ticks: int) -> Decimal:
+        return Decimal(self.format(ticks))
+
+    def format(self, ticks: int) -> str:
+        """Render ticks as a decimal price string, e.g. 3246 -> '32.46'."""
+        if self._decimals is None:
+            return str(ticks * self.tick_size)
+        if self._decimals == 0:
+            return str(ticks)
+        units, fraction = divmod(abs(ticks), 10 ** self._decimals)
+        sign = "-" if ticks < 0 else ""
+        return f"{sign}{units}.{fraction:0{self._decimals}d}"
+
+    def render(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the record with every price held in ticks rendered as a decimal
+        string. Prices that are already strings (e.g. read back from a JSON
+        file) are left alone. The input is not modified.
+        """
+        rendered = None
+        for field in PRICE_FIELDS:
+            value = record.get(field)
+            if type(value) is int:
+                rendered = rendered or dict(record)
+                rendered[field] = self.format(value)
+        return rendered or record
@@ -0,0 +1,85 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : scenario_labels.py
+# Description      : Ground-truth label index for the manipulation
+# scenarios: which trades belong to which scenario instance, and in what
+# role. Written as a CSV sidecar next to the trades file.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# scenario_labels.py
+
+import csv
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from trade_batch import TradeBatch
+
+DEFAULT_LABELS_FILE = "trade_labels.csv"
+
+LABEL_FIELDS = ("_id", "scenario_type", "scenario_instance", "pattern_role")
+
+class TradeLabel(NamedTuple):
+    scenario_type: str
+    scenario_instance: Optional[str]
+    pattern_role: str
+
+def scenario_labels(trades: TradeBatch) -> Iterator[tuple]:
+    """
+    (_id, scenario_type, scenario_instance, pattern_role) for every scenario
+    trade in a batch, once per _id. Scenario trades are the rows carrying a
+    pattern_role, which only ever sits in the batch's sparse extras, so the
+    base trades are never visited.
+    """
+    seen = set()
+    scenario_types = trades.categoricals["scenario_type"]
+    for row in sorted(trades.extras):
+        fields = trades.extras[row]
+        role = fields.get("pattern_role")
+        if role is None:
+            continue
+        trade_id = trades.id_at(row)
+        # A cancelled or corrected leg appears again under the same _id
+        if trade_id in seen:
+            continue
+        seen.add(trade_id)
+        yield trade_id, scenario_types.value(row), fields.get("scenario_instance"), role
+
+class ScenarioLabelWriter:
+    """
+    Appends the labels of the scenario trades in each batch written to it
+    (the same write() interface as the trades writers) to a CSV file.
+    With append=True new labels go after an existing file's rows.
+    """
+    def __init__(self, file_path: str = DEFAULT_LABELS_FILE, append: bool = False):
+        self.file_path = file_path
+        self.count = 0
+        write_header = not (append and Path(file_path).is_file())
+        self._file = open(file_path, "a" if append else "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(LABEL_FIELDS)
+
+    def write(self, trades: TradeBatch) -> None:
+        for label in scenario_labels(trades):
+            self._writer.writerow(label)
+            self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ScenarioLabelWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def load_labels(file_path: str) -> Dict[str, TradeLabel]:
+    """Read a label file back into _id -> TradeLabel."""
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        return {
+            row["_id"]: TradeLabel(row["scenario_type"], row["scenario_instance"] or None, row["pattern_role"])
+            for row in csv.DictReader(f)
+        }
@@ -0,0 +1,107 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : scenario_scheduler.py
+# Description      : Injects manipulation scenarios throughout the
+# generated date range at a configurable rate per symbol per day, building
+# each day's scenarios alongside its trades.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# scenario_scheduler.py
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from generator import BitemporalDataGenerator
+from scenarios import SCENARIO_REGISTRY, get_scenario
+from timestamps import to_epoch_us, MINUTE_US, HOUR_US
+from trade_batch import TradeBatch
+
+logger = logging.getLogger(__name__)
+
+# Instances start no later than this into the day, so even the longest
+# pattern (wash trading, about an hour) finishes on the same day
+LATEST_START_US = 22 * HOUR_US
+
+class ScenarioScheduler:
+    """
+    Builds the scheduled scenarios for each trading day.
+
+    rates maps a registered pattern name (see scenarios.register_scenario)
+    to the expected number of instances per symbol
+    per day. A fractional rate places the whole part every day and one more
+    instance with the remaining probability (0.25 means one instance on about
+    a quarter of the days). Each day draws from its own seeded streams
+    (BitemporalDataGenerator.scenario_streams()), so the scenarios don't
+    depend on which process builds them.
+
+    iter_dataset() builds each day's scenarios in the generator's own shard
+    tasks, so scheduled scenarios use the same worker processes as the base
+    trades rather than a second pool.
+    """
+    def __init__(
+        self,
+        generator: BitemporalDataGenerator,
+        rates: Dict[str, float],
+        symbols: Optional[List[str]] = None
+    ):
+        unknown = set(rates) - set(SCENARIO_REGISTRY)
+        if unknown:
+            raise ValueError(f"Unknown scenario patterns in schedule: {sorted(unknown)}")
+        self.generator = generator
+        self.rates = {name: float(rate) for name, rate in rates.items() if rate}
+        self.symbols = symbols or list(generator.security_tickers)
+
+    @classmethod
+    def from_config(
+        cls,
+        generator: BitemporalDataGenerator,
+        config: Dict[str, Any]
+    ) -> Optional["ScenarioScheduler"]:
+        """The scheduler configured under scenario_schedule:, or None if it is disabled."""
+        schedule = config.get("scenario_schedule", {})
+        if not schedule.get("enabled"):
+            return None
+        return cls(
+            generator,
+            schedule.get("instances_per_symbol_per_day", {}),
+            schedule.get("symbols")
+        )
+
+    def build_day(self, day: datetime) -> TradeBatch:
+        """All scheduled scenario trades for one day."""
+        return _DayScenarioBuilder(self.rates, self.symbols)(self.generator, day)
+
+    def iter_dataset(self) -> Iterator[Tuple[datetime, TradeBatch, List[Dict[str, Any]], TradeBatch]]:
+        """
+        The generator's iter_dataset() with each day's scheduled scenarios:
+        yields (day, trades, counterparty_versions, scenario_trades).
+        """
+        return self.generator.iter_dataset(scenarios=_DayScenarioBuilder(self.rates, self.symbols))
+
+class _DayScenarioBuilder:
+    """
+    A day's scheduled scenarios, built against whichever copy of the
+    generator runs the day. Holds only the schedule, so it is cheap to send
+    to worker processes with each shard.
+    """
+    def __init__(self, rates: Dict[str, float], symbols: List[str]):
+        self.rates = rates
+        self.symbols = symbols
+
+    def __call__(self, generator: BitemporalDataGenerator, day: datetime) -> TradeBatch:
+        day_us = to_epoch_us(day)
+        instances = []
+        with generator.scenario_streams(day) as rand:
+            for name, rate in self.rates.items():
+                build = get_scenario(name)
+                whole, fraction = divmod(rate, 1)
+                for symbol in self.symbols:
+                    count = int(whole) + (rand.random() < fraction)
+                    for _ in range(count):
+                        start = day_us + rand.randrange(LATEST_START_US // MINUTE_US) * MINUTE_US
+                        instances.append(build(generator, start, symbol=symbol, rand=rand))
+        return TradeBatch.concat(instances)
@@ -1,14 +1,149 @@
 # scenarios.py
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 import random
 
 from generator import BitemporalDataGenerator
+from timestamps import to_epoch_us, SECOND_US, MINUTE_US, HOUR_US
+from trade_batch import TradeBatch
 
+class ScenarioPattern:
+    """
+    A registered manipulation pattern: its build function and where the
+    one-off scenario run places it relative to the run's base time.
+    """
+    def __init__(self, name: str, build: Callable[..., TradeBatch], start_offset_us: int = 0):
+        self.name = name
+        self.build = build
+        self.start_offset_us = start_offset_us
+
+    def __call__(self, *args, **kwargs) -> TradeBatch:
+        return self.build(*args, **kwargs)
+
+# Pattern name -> pattern, in registration order
+SCENARIO_REGISTRY: Dict[str, ScenarioPattern] = {}
+
+def register_scenario(name: str, start_offset_us: int = 0) -> Callable:
+    """
+    Decorator that registers a scenario function under a pattern name, so
+    the one-off scenario run and the scenario scheduler pick it up. The
+    function must take (generator, base_time, symbol=None, rand=None) and
+    return a TradeBatch.
+
+    Raises:
+        ValueError: If a pattern is already registered under the name
+    """
+    def register(build: Callable[..., TradeBatch]) -> Callable[..., TradeBatch]:
+        if name in SCENARIO_REGISTRY:
+            raise ValueError(f"Scenario pattern {name!r} is already registered")
+        SCENARIO_REGISTRY[name] = ScenarioPattern(name, build, start_offset_us)
+        return build
+    return register
+
+def get_scenario(name: str) -> ScenarioPattern:
+    """
+    Raises:
+        ValueError: If no pattern is registered under the name
+    """
+    try:
+        return SCENARIO_REGISTRY[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown scenario pattern {name!r}; registered: {sorted(SCENARIO_REGISTRY)}"
+        ) from None
+
+class ScenarioBuilder:
+    """
+    Assembles the trades of one scenario instance.
+
+    Every leg is a suspicious trade of the builder's scenario type, placed at
+    an offset from the base time and tagged with its pattern_role. Legs are
+    indexed by role and by their sequence number within the role as they are
+    added, so later steps (cancelling the layers, matching the wash legs)
+    look them up directly instead of scanning the instance's trades. Every
+    leg also records its instance as scenario_instance (the first leg's _id).
+    """
+    def __init__(
+        self,
+        generator: BitemporalDataGenerator,
+        scenario_type: str,
+        base_time: Union[datetime, int],
+        symbol: Optional[str] = None,
+        rand: Optional[random.Random] = None
+    ):
+        self.generator = generator
+        self.scenario_type = scenario_type
+        self.base_time = to_epoch_us(base_time)
+        # The generator's seeded stream unless the caller passes its own
+        self.rand = rand or generator._random
+        # Every leg trades the one security, drawn here unless pinned
+        self.symbol = symbol or self.rand.choice(generator.security_tickers)
+        self.counterparties = generator.counterparties
+        self.instance_id: Optional[str] = None
+        self._docs: List[Dict[str, Any]] = []
+        self._legs_by_role: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add_leg(
+        self,
+        offset_us: int,
+        counterparty: Dict[str, Any],
+        side: str,
+        role: str,
+        **fields: Any
+    ) -> Dict[str, Any]:
+        """
+        Generate a leg offset_us after the base time and add it to the
+        instance. Extra keyword fields are set on the trade.
+
+        Returns:
+            The leg, which can still be modified until build()
+        """
+        trade = self.generator.generate_trade(
+            trade_date=self.base_time + offset_us,
+            is_suspicious=True,
+            scenario_type=self.scenario_type,
+            counterparty_id=counterparty["_id"],
+            side=side,
+            symbol=self.symbol
+        )
+        # The first leg's _id names the instance, which the label index uses
+        if self.instance_id is None:
+            self.instance_id = trade["_id"]
+        trade["pattern_role"] = role
+        trade["scenario_instance"] = self.instance_id
+        trade.update(fields)
+        self._docs.append(trade)
+        self._legs_by_role.setdefault(role, []).append(trade)
+        return trade
+
+    def legs(self, role: str) -> List[Dict[str, Any]]:
+        """The legs with a role, in the order they were added."""
+        return self._legs_by_role.get(role, [])
+
+    def leg(self, role: str, sequence: int) -> Dict[str, Any]:
+        """The sequence-th (1-based) leg added with a role."""
+        return self._legs_by_role[role][sequence - 1]
+
+    def cancel(self, leg: Dict[str, Any], cancel_time: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Close a leg at cancel_time (epoch microseconds) and add its closed
+        original and cancelled version to the instance.
+        """
+        original, cancelled = self.generator.generate_trade_correction(leg, cancel_time)
+        cancelled["trade_status"] = "cancelled"
+        self._docs.extend([original, cancelled])
+        return original, cancelled
+
+    def build(self) -> TradeBatch:
+        return TradeBatch.from_records(self._docs)
+
+@register_scenario("layering")
 def generate_layering_scenario(
     generator: BitemporalDataGenerator,
-    base_time: datetime
-) -> List[Dict[str, Any]]:
+    base_time: Union[datetime, int],
+    symbol: Optional[str] = None,
+    rand: Optional[random.Random] = None
+) -> TradeBatch:
     """
     Generate a layering pattern scenario.
     
@@ -21,69 +156,59 @@ def generate_layering_scenario(
     4. Cancels the layered orders
     
     This scenario creates a sequence of trades that mimics this pattern
-    while maintaining temporal validity.
+    while maintaining temporal validity. base_time is in epoch microseconds
+    (a datetime is also accepted), as are all the scenario timestamps.
+    All the legs of an instance trade one security: symbol if given,
+    otherwise one drawn for the instance. Every scenario also takes an
+    optional rand (random.Random) for its random choices,
+    which defaults to the generator's seeded stream.
     """
-    docs = []
-    scenario_type = "layering"
-    
-    # Select a security with enough liquidity for layering
-    security = random.choice(['AAPL', 'MSFT'])  # High volume securities
+    scenario = ScenarioBuilder(generator, "layering", base_time, symbol, rand)
+    rand = scenario.rand
     
     # Choose a counterparty for the manipulation
-    manipulator_cp = random.choice(generator.counterparties)
+    manipulator_cp = rand.choice(scenario.counterparties)
     
     # Step 1: Create multiple layer orders (typically on the sell side)
     # These create artificial selling pressure
-    num_layers = random.randint(4, 6)
+    num_layers = rand.randint(4, 6)
     
     for i in range(num_layers):
-        layer_time = base_time + timedelta(seconds=30*i)
         # Each layer slightly improves the price
-        layer_trade = generator.generate_trade(
-            trade_date=layer_time,
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=manipulator_cp["_id"],
-            side="S"  # Sell side layers
+        scenario.add_leg(
+            30 * i * SECOND_US,
+            manipulator_cp,
+            "S",  # Sell side layers
+            "deceptive_layer",
+            layer_sequence=i+1
         )
-        # Add metadata specific to layering
-        layer_trade.update({
-            "layer_sequence": i+1,
-            "pattern_role": "deceptive_layer"
-        })
-        docs.append(layer_trade)
     
     # Step 2: Execute the real (larger) trade on the opposite side
     # after the layers have created price pressure
-    execution_time = base_time + timedelta(minutes=2)
-    real_trade = generator.generate_trade(
-        trade_date=execution_time,
-        is_suspicious=True,
-        scenario_type=scenario_type,
-        counterparty_id=manipulator_cp["_id"],
-        side="B"  # Buy side execution
+    execution_offset = 2 * MINUTE_US
+    real_trade = scenario.add_leg(
+        execution_offset,
+        manipulator_cp,
+        "B",  # Buy side execution
+        "actual_execution"
     )
     # Modify quantity to be larger than the layers
     real_trade["quantity"] *= 3
-    real_trade["pattern_role"] = "actual_execution"
-    docs.append(real_trade)
     
     # Step 3: Cancel the layered orders
     for i in range(num_layers):
-        cancel_time = execution_time + timedelta(seconds=random.randint(1, 30))
-        original, correction = generator.generate_trade_correction(
-            next(t for t in docs if t.get("layer_sequence") == i+1),
-            cancel_time
-        )
-        correction["trade_status"] = "cancelled"
-        docs.extend([original, correction])
+        cancel_time = scenario.base_time + execution_offset + rand.randint(1, 30) * SECOND_US
+        scenario.cancel(scenario.leg("deceptive_layer", i+1), cancel_time)
     
-    return docs
+    return scenario.build()
 
+@register_scenario("wash_trading", start_offset_us=30 * MINUTE_US)
 def generate_wash_trading_scenario(
     generator: BitemporalDataGenerator,
-    base_time: datetime
-) -> List[Dict[str, Any]]:
+    base_time: Union[datetime, int],
+    symbol: Optional[str] = None,
+    rand: Optional[random.Random] = None
+) -> TradeBatch:
     """
     Generate a wash trading scenario.
     
@@ -96,55 +221,42 @@ def generate_wash_trading_scenario(
     This scenario creates a series of trades that demonstrate these patterns
     while maintaining realistic market behavior.
     """
-    docs = []
-    scenario_type = "wash_trading"
+    scenario = ScenarioBuilder(generator, "wash_trading", base_time, symbol, rand)
+    rand = scenario.rand
+    counterparties = scenario.counterparties
     
     # Select two related counterparties (could be same beneficial owner)
-    cp_a = random.choice(generator.counterparties)
-    related_cps = [
-        cp for cp in generator.counterparties 
-        if cp["beneficial_owner_id"] == cp_a["beneficial_owner_id"]
-        and cp["_id"] != cp_a["_id"]
-    ]
-    cp_b = random.choice(related_cps) if related_cps else random.choice(generator.counterparties)
+    cp_a = rand.choice(counterparties)
+    cp_b = (
+        counterparties.choice(rand, beneficial_owner=cp_a["beneficial_owner_id"], exclude=cp_a["_id"])
+        or rand.choice(counterparties)
+    )
     
     # Generate a series of wash trades over a short period
-    num_pairs = random.randint(3, 5)
+    num_pairs = rand.randint(3, 5)
     
     for i in range(num_pairs):
         # First leg of wash trade
-        trade_time = base_time + timedelta(minutes=i*15)
-        trade_a = generator.generate_trade(
-            trade_date=trade_time,
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=cp_a["_id"],
-            side="B"
-        )
-        trade_a["pattern_role"] = "wash_buy"
+        trade_offset = i * 15 * MINUTE_US
+        trade_a = scenario.add_leg(trade_offset, cp_a, "B", "wash_buy")
         
         # Matching second leg
-        trade_b = generator.generate_trade(
-            trade_date=trade_time + timedelta(minutes=random.randint(1, 5)),
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=cp_b["_id"],
-            side="S"
+        trade_b = scenario.add_leg(
+            trade_offset + rand.randint(1, 5) * MINUTE_US, cp_b, "S", "wash_sell"
         )
         # Ensure matching characteristics
         trade_b["quantity"] = trade_a["quantity"]
         trade_b["price"] = trade_a["price"]
-        trade_b["pattern_role"] = "wash_sell"
-        trade_b["symbol"] = trade_a["symbol"]
-        
-        docs.extend([trade_a, trade_b])
     
-    return docs
+    return scenario.build()
 
+@register_scenario("spoofing", start_offset_us=HOUR_US)
 def generate_spoofing_scenario(
     generator: BitemporalDataGenerator,
-    base_time: datetime
-) -> List[Dict[str, Any]]:
+    base_time: Union[datetime, int],
+    symbol: Optional[str] = None,
+    rand: Optional[random.Random] = None
+) -> TradeBatch:
     """
     Generate a spoofing scenario.
     
@@ -156,63 +268,48 @@ def generate_spoofing_scenario(
     
     This creates a realistic spoofing pattern with proper temporal sequencing.
     """
-    docs = []
-    scenario_type = "spoofing"
-    
-    # Select a security suitable for spoofing (liquid enough to absorb large orders)
-    security = random.choice(['GOOGL', 'AMZN'])  # High-value securities
+    scenario = ScenarioBuilder(generator, "spoofing", base_time, symbol, rand)
+    rand = scenario.rand
     
     # Choose a sophisticated counterparty for the manipulation
-    sophisticated_cps = [
-        cp for cp in generator.counterparties 
-        if cp["account_type"] in ['I', 'P']  # Institutional or Proprietary
-    ]
-    spoofer_cp = random.choice(sophisticated_cps if sophisticated_cps else generator.counterparties)
+    spoofer_cp = (
+        scenario.counterparties.choice(rand, account_types=['I', 'P'])  # Institutional or Proprietary
+        or rand.choice(scenario.counterparties)
+    )
     
     # Place the spoof order (large size, away from market)
-    spoof_time = base_time
-    spoof_order = generator.generate_trade(
-        trade_date=spoof_time,
-        is_suspicious=True,
-        scenario_type=scenario_type,
-        counterparty_id=spoofer_cp["_id"],
-        side="S"  # Typically sell side for spoofing
+    spoof_order = scenario.add_leg(
+        0,
+        spoofer_cp,
+        "S",  # Typically sell side for spoofing
+        "spoof_order",
+        trade_status="pending"
     )
     # Amplify the spoof order size
     spoof_order["quantity"] *= 10
-    spoof_order["pattern_role"] = "spoof_order"
-    spoof_order["trade_status"] = "pending"
-    docs.append(spoof_order)
     
     # Execute the real trades while spoof order is active
-    num_real_trades = random.randint(2, 4)
+    num_real_trades = rand.randint(2, 4)
     for i in range(num_real_trades):
-        trade_time = spoof_time + timedelta(seconds=random.randint(30, 120))
-        real_trade = generator.generate_trade(
-            trade_date=trade_time,
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=spoofer_cp["_id"],
-            side="B"  # Opposite side of spoof
+        scenario.add_leg(
+            rand.randint(30, 120) * SECOND_US,
+            spoofer_cp,
+            "B",  # Opposite side of spoof
+            "actual_execution"
         )
-        real_trade["symbol"] = spoof_order["symbol"]
-        real_trade["pattern_role"] = "actual_execution"
-        docs.append(real_trade)
     
     # Cancel the spoof order
-    cancel_time = spoof_time + timedelta(minutes=2)
-    original, cancelled = generator.generate_trade_correction(
-        spoof_order, cancel_time
-    )
-    cancelled["trade_status"] = "cancelled"
-    docs.extend([original, cancelled])
+    scenario.cancel(spoof_order, scenario.base_time + 2 * MINUTE_US)
     
-    return docs
+    return scenario.build()
 
+@register_scenario("momentum_ignition", start_offset_us=2 * HOUR_US)
 def generate_momentum_ignition_scenario(
     generator: BitemporalDataGenerator,
-    base_time: datetime
-) -> List[Dict[str, Any]]:
+    base_time: Union[datetime, int],
+    symbol: Optional[str] = None,
+    rand: Optional[random.Random] = None
+) -> TradeBatch:
     """
     Generate a momentum ignition scenario.
     
@@ -224,80 +321,52 @@ def generate_momentum_ignition_scenario(
     
     This creates a realistic pattern that could trigger momentum strategies.
     """
-    docs = []
-    scenario_type = "momentum_ignition"
-    
-    # Select a security susceptible to momentum trading
-    security = random.choice(['AAPL', 'TSLA'])  # High-beta stocks
+    scenario = ScenarioBuilder(generator, "momentum_ignition", base_time, symbol, rand)
+    rand = scenario.rand
     
     # Choose a sophisticated counterparty
-    sophisticated_cps = [
-        cp for cp in generator.counterparties 
-        if cp["account_type"] == 'I'  # Institutional
-    ]
-    manipulator_cp = random.choice(sophisticated_cps if sophisticated_cps else generator.counterparties)
+    manipulator_cp = (
+        scenario.counterparties.choice(rand, account_types=['I'])  # Institutional
+        or rand.choice(scenario.counterparties)
+    )
     
     # Phase 1: Aggressive initial orders to start momentum
-    num_initial = random.randint(3, 5)
+    num_initial = rand.randint(3, 5)
     for i in range(num_initial):
-        trade_time = base_time + timedelta(seconds=i*10)
-        ignition_trade = generator.generate_trade(
-            trade_date=trade_time,
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=manipulator_cp["_id"],
-            side="B"  # Usually buying to start upward momentum
+        scenario.add_leg(
+            i * 10 * SECOND_US,
+            manipulator_cp,
+            "B",  # Usually buying to start upward momentum
+            "momentum_ignition"
         )
-        ignition_trade["pattern_role"] = "momentum_ignition"
-        ignition_trade["symbol"] = security
-        docs.append(ignition_trade)
     
     # Phase 2: Wait period for momentum traders (simulated by time gap)
     
     # Phase 3: Profit taking trades
-    num_profit = random.randint(2, 4)
+    num_profit = rand.randint(2, 4)
     for i in range(num_profit):
-        trade_time = base_time + timedelta(minutes=5) + timedelta(seconds=i*30)
-        profit_trade = generator.generate_trade(
-            trade_date=trade_time,
-            is_suspicious=True,
-            scenario_type=scenario_type,
-            counterparty_id=manipulator_cp["_id"],
-            side="S"  # Selling into the momentum
+        scenario.add_leg(
+            5 * MINUTE_US + i * 30 * SECOND_US,
+            manipulator_cp,
+            "S",  # Selling into the momentum
+            "profit_taking"
         )
-        profit_trade["pattern_role"] = "profit_taking"
-        profit_trade["symbol"] = security
-        docs.append(profit_trade)
     
-    return docs
+    return scenario.build()
 
 def get_all_scenarios(
     generator: BitemporalDataGenerator,
-    base_time: datetime
-) -> List[Dict[str, Any]]:
+    base_time: Union[datetime, int],
+    patterns: Optional[List[str]] = None
+) -> TradeBatch:
     """
-    Generate all manipulation scenarios with proper spacing.
+    Generate one instance of each registered scenario (or of the named
+    patterns), each at its pattern's start offset from base_time.
     Ensures scenarios don't interfere with each other temporally.
     """
-    all_docs = []
-    
-    # Layering scenario
-    layering_docs = generate_layering_scenario(generator, base_time)
-    all_docs.extend(layering_docs)
-    
-    # Wash trading scenario (start 30 minutes after layering)
-    wash_time = base_time + timedelta(minutes=30)
-    wash_docs = generate_wash_trading_scenario(generator, wash_time)
-    all_docs.extend(wash_docs)
-    
-    # Spoofing scenario (start 1 hour after initial)
-    spoof_time = base_time + timedelta(hours=1)
-    spoof_docs = generate_spoofing_scenario(generator, spoof_time)
-    all_docs.extend(spoof_docs)
-    
-    # Momentum ignition (start 2 hours after initial)
-    momentum_time = base_time + timedelta(hours=2)
-    momentum_docs = generate_momentum_ignition_scenario(generator, momentum_time)
-    all_docs.extend(momentum_docs)
-    
-    return all_docs
\ No newline at end of file
+    base_time = to_epoch_us(base_time)
+    names = patterns if patterns is not None else list(SCENARIO_REGISTRY)
+    return TradeBatch.concat([
+        get_scenario(name)(generator, base_time + get_scenario(name).start_offset_us)
+        for name in names
+    ])
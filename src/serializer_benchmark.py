@@ -0,0 +1,150 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : serializer_benchmark.py
+# Description      : Encode throughput of the JSON serializer backends on
+# generated trades and counterparties, compact and indented.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# serializer_benchmark.py
+#
+# Usage:
+#   python serializer_benchmark.py --config config.yaml --records 200000
+#
+# Records are rendered (ISO timestamps, decimal price strings) once up front,
+# exactly as the output writers hand them to the serializer, so the timings
+# cover encoding alone. Backends that aren't installed are skipped.
+
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from generator import BitemporalDataGenerator
+from pricing import TickScale, DEFAULT_TICK_SIZE
+from serializers import available_backends, get_serializer
+from timestamps import render_timestamps
+
+logger = logging.getLogger(__name__)
+
+# Indents benchmarked by default: compact (ndjson, json_indent: null) and
+# the default JSON array layout
+DEFAULT_INDENTS = (None, 4)
+
+def sample_records(config: Dict[str, Any], records: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Rendered trades (about the requested number, whole days at a time) and
+    the initial counterparties from the configured generator.
+    """
+    generator = BitemporalDataGenerator(
+        start_date=config["date_range"]["start_date"],
+        end_date=config["date_range"]["end_date"],
+        config=config
+    )
+    price_scale = TickScale(config.get("generation", {}).get("tick_size", DEFAULT_TICK_SIZE))
+    trades: List[Dict[str, Any]] = []
+    for _, day_trades, _ in generator.iter_dataset():
+        trades.extend(price_scale.render(render_timestamps(r)) for r in day_trades.iter_records())
+        if len(trades) >= records:
+            break
+    counterparties = [render_timestamps(cp) for cp in generator.counterparties]
+    return {"trades": trades[:records], "counterparties": counterparties}
+
+def time_backend(
+    backend: str,
+    records: List[Dict[str, Any]],
+    indent: Optional[int],
+    repeat: int = 3
+) -> Dict[str, Any]:
+    """Best of repeat passes encoding every record with one backend."""
+    serializer = get_serializer(backend, indent)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = sum(len(serializer.dumps(record)) for record in records)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return {
+        "backend": backend,
+        # A backend that can't produce the indent falls back to another one
+        "used": serializer.name,
+        "indent": indent,
+        "records": len(records),
+        "seconds": best,
+        "records_per_second": len(records) / best if best else None,
+        "mb_per_second": encoded / best / 1e6 if best else None
+    }
+
+def run_benchmark(
+    config: Dict[str, Any],
+    records: int,
+    backends: Optional[List[str]] = None,
+    indents: Optional[List[Optional[int]]] = None,
+    repeat: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Returns:
+        One result dict per (record type, indent, backend)
+    """
+    backends = backends or list(available_backends())
+    indents = list(DEFAULT_INDENTS) if indents is None else indents
+    samples = sample_records(config, records)
+    results = []
+    for record_type, sample in samples.items():
+        for indent in indents:
+            for backend in backends:
+                result = {"record_type": record_type, **time_backend(backend, sample, indent, repeat)}
+                logger.info(f"{record_type} indent={indent} {backend}: {result['records_per_second']:.0f} records/s")
+                results.append(result)
+    return results
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'records':<15} {'indent':>6} {'backend':<8} {'used':<8} {'count':>8} "
+        f"{'seconds':>8} {'records/s':>11} {'MB/s':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        indent = "-" if r["indent"] is None else r["indent"]
+        print(
+            f"{r['record_type']:<15} {indent:>6} {r['backend']:<8} {r['used']:<8} {r['records']:>8} "
+            f"{r['seconds']:>8.3f} {r['records_per_second']:>11.0f} {r['mb_per_second']:>8.1f}"
+        )
+
+def _indent(value: str) -> Optional[int]:
+    return None if value in ("none", "null") else int(value)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Encode throughput of the JSON serializer backends")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Path to YAML configuration file")
+    parser.add_argument("--records", type=int, default=100000, help="Number of trades to encode")
+    parser.add_argument(
+        "--backends", type=str, nargs="+", choices=list(available_backends()),
+        help="Backends to compare (default: every installed one)"
+    )
+    parser.add_argument(
+        "--indents", type=_indent, nargs="+",
+        help="Indents to benchmark; 'none' for compact (default: none 4)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per backend; the fastest is reported")
+    parser.add_argument("--report", type=str, default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+
+    results = run_benchmark(config, args.records, args.backends, args.indents, args.repeat)
+    print_report(results)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
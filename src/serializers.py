@@ -0,0 +1,203 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : serializers.py
+# Description      : Pluggable JSON encoding for the output writers and the
+# inserter: orjson or msgspec when installed, the stdlib json module
+# otherwise.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# serializers.py
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_BACKENDS = ("orjson", "msgspec", "stdlib")
+# "auto" takes the first installed backend in SERIALIZER_BACKENDS order
+DEFAULT_SERIALIZER = "auto"
+
+def _iso(value: Any) -> str:
+    """datetimes as '%Y-%m-%dT%H:%M:%S.%fZ' (UTC), the format used in the output files."""
+    if isinstance(value, datetime):
+        if value.utcoffset():
+            value = value - value.utcoffset()
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return value.isoformat()
+
+def _default(value: Any) -> Any:
+    """Fallback for types a backend can't encode: Decimals and dates as strings."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return _iso(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class _StdlibEncoder(json.JSONEncoder):
+    def default(self, o):
+        try:
+            return _default(o)
+        except TypeError:
+            return super().default(o)
+
+class Serializer(ABC):
+    """
+    Encodes one JSON value to UTF-8 bytes.
+
+    indent is None for compact output (no whitespace at all) or the number of
+    spaces per nesting level. Decimals are written as strings and datetimes as
+    ISO-8601 UTC strings by every backend, so the output doesn't depend on
+    which one is installed.
+    """
+    name = "base"
+
+    def __init__(self, indent: Optional[int] = None):
+        self.indent = indent
+
+    @classmethod
+    def supports_indent(cls, indent: Optional[int]) -> bool:
+        return True
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        ...
+
+class StdlibSerializer(Serializer):
+    name = "stdlib"
+
+    def __init__(self, indent: Optional[int] = None):
+        super().__init__(indent)
+        if indent is None:
+            self._encoder = _StdlibEncoder(separators=(",", ":"), ensure_ascii=False)
+        else:
+            self._encoder = _StdlibEncoder(indent=indent, ensure_ascii=False)
+
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value).encode("utf-8")
+
+class OrjsonSerializer(Serializer):
+    """
+    orjson is told to pass datetimes through, so they and Decimals go through
+    _default() like the other backends (its native datetime format differs).
+    orjson only indents by two spaces, so wider (even) indents widen its
+    leading whitespace afterwards (see _widen()).
+    """
+    name = "orjson"
+
+    def __init__(self, indent: Optional[int] = None):
+        super().__init__(indent)
+        self._options = orjson.OPT_PASSTHROUGH_DATETIME
+        if indent is not None:
+            self._options |= orjson.OPT_INDENT_2
+
+    @classmethod
+    def supports_indent(cls, indent: Optional[int]) -> bool:
+        return indent is None or (indent > 0 and indent % 2 == 0)
+
+    def _widen(self, encoded: bytes) -> bytes:
+        """
+        Re-indent two-space output to self.indent spaces per level, one
+        bytes.replace() per nesting level. JSON strings can't hold a raw
+        newline, so every newline-plus-spaces run is indentation. Level j's
+        pass matches the lines at depth j or deeper (the shallower passes
+        have already widened them) and widens each by one more level.
+        """
+        extra = self.indent - 2
+        depth = 1
+        while True:
+            run = b"\n" + b" " * (2 * depth + extra * (depth - 1))
+            if run not in encoded:
+                return encoded
+            encoded = encoded.replace(run, run + b" " * extra)
+            depth += 1
+
+    def dumps(self, value: Any) -> bytes:
+        encoded = orjson.dumps(value, default=_default, option=self._options)
+        if self.indent is not None and self.indent != 2:
+            encoded = self._widen(encoded)
+        return encoded
+
+def _render_datetimes(value: Any) -> Any:
+    """
+    value with every datetime, however deeply nested, replaced by _iso(). The
+    containers are only copied when they hold a datetime somewhere.
+    """
+    if isinstance(value, datetime):
+        return _iso(value)
+    if isinstance(value, dict):
+        rendered = {k: _render_datetimes(v) for k, v in value.items()}
+        return rendered if any(rendered[k] is not v for k, v in value.items()) else value
+    if isinstance(value, (list, tuple)):
+        rendered = [_render_datetimes(v) for v in value]
+        return rendered if any(r is not v for r, v in zip(rendered, value)) else value
+    return value
+
+class MsgspecSerializer(Serializer):
+    """
+    msgspec encodes Decimals (as strings) natively. It also encodes datetimes
+    natively, in its own format, and never passes them to enc_hook, so they
+    are rendered with _iso() before encoding.
+    """
+    name = "msgspec"
+
+    def __init__(self, indent: Optional[int] = None):
+        super().__init__(indent)
+        self._encoder = msgspec.json.Encoder(enc_hook=_default, decimal_format="string")
+
+    @classmethod
+    def supports_indent(cls, indent: Optional[int]) -> bool:
+        return indent is None
+
+    def dumps(self, value: Any) -> bytes:
+        # Keep the output-file timestamp format rather than msgspec's own
+        return self._encoder.encode(_render_datetimes(value))
+
+_BACKEND_CLASSES = {
+    "orjson": OrjsonSerializer,
+    "msgspec": MsgspecSerializer,
+    "stdlib": StdlibSerializer
+}
+
+def available_backends() -> Dict[str, type]:
+    """The installed backends, fastest first."""
+    installed = {"orjson": orjson is not None, "msgspec": msgspec is not None, "stdlib": True}
+    return {name: _BACKEND_CLASSES[name] for name in SERIALIZER_BACKENDS if installed[name]}
+
+def get_serializer(backend: str = DEFAULT_SERIALIZER, indent: Optional[int] = None) -> Serializer:
+    """
+    A serializer from the named backend, or "auto" for the fastest installed
+    one. A backend that isn't installed, or can't produce the requested
+    indent, falls back to the next one (ultimately stdlib).
+
+    Raises:
+        ValueError: If backend is not "auto" or one of SERIALIZER_BACKENDS
+    """
+    if backend != "auto" and backend not in SERIALIZER_BACKENDS:
+        raise ValueError(f"Unknown serializer {backend!r}; expected auto or one of {SERIALIZER_BACKENDS}")
+    candidates = available_backends()
+    if backend != "auto":
+        if backend not in candidates:
+            logger.info(f"Serializer {backend} is not installed, falling back")
+        else:
+            candidates = {backend: candidates[backend], **candidates}
+    for name, cls in candidates.items():
+        if cls.supports_indent(indent):
+            return cls(indent)
+    return StdlibSerializer(indent)
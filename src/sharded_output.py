@@ -0,0 +1,289 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : sharded_output.py
+# Description      : Trades output split into shard files per day and/or
+# symbol hash bucket, with a manifest (rows, time range, size, checksum per
+# shard) so the inserter and offline analytics can fan out across shards.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# sharded_output.py
+
+import hashlib
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from pricing import TickScale
+from timestamps import DAY_US, iso_from_epoch_us, date_from_epoch_us, to_epoch_us
+from trade_batch import TradeBatch
+from output_writers import (
+    BackgroundWriter, COMPRESSION_SUFFIXES, DEFAULT_OUTPUT_FORMAT, open_writer
+)
+
+logger = logging.getLogger(__name__)
+
+# "none" writes the single trades_file. "day" shards on the UTC day of
+# _valid_from, "symbol" on a stable hash of the symbol, "day_symbol" on both.
+SHARD_BY = ("none", "day", "symbol", "day_symbol")
+DEFAULT_SHARD_DIR = "trades_shards"
+DEFAULT_SYMBOL_BUCKETS = 8
+SHARD_MANIFEST_FILE = "manifest.json"
+
+FORMAT_SUFFIXES = {"json": ".json", "ndjson": ".ndjson", "parquet": ".parquet", "arrow": ".arrow"}
+
+_ISO_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+def shards_by_day(output_config: Dict[str, Any]) -> bool:
+    return output_config.get("shard_by", "none") in ("day", "day_symbol")
+
+def symbol_bucket(symbol: str, buckets: int) -> int:
+    """Stable symbol -> bucket (CRC-32, unlike hash() it doesn't change between runs)."""
+    return zlib.crc32(symbol.encode("utf-8")) % buckets
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ShardedTradeWriter:
+    """
+    Routes trades into one output file per shard under shard_dir, each
+    written by the writer open_writer() builds for the configured format and
+    stream compression, and keeps a manifest entry per shard: row count,
+    first and last _valid_from, bytes on disk and SHA-256.
+
+    Day shards expect trades in _valid_from order (main.py turns the sort on
+    for them): once a later day turns up, the earlier days' shards are closed,
+    so only one day's files are open at a time. A trade for a day that has
+    already been closed is an error.
+
+    With append=True the existing manifest is loaded and shards that already
+    exist are appended to (uncompressed json/ndjson only).
+    """
+    def __init__(
+        self,
+        shard_dir: str,
+        output_config: Dict[str, Any],
+        price_scale: Optional[TickScale] = None,
+        append: bool = False,
+        shard_by: str = "day",
+        symbol_buckets: int = DEFAULT_SYMBOL_BUCKETS
+    ):
+        if shard_by not in SHARD_BY or shard_by == "none":
+            raise ValueError(f"Unknown shard_by {shard_by!r}; expected one of {SHARD_BY[1:]}")
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.price_scale = price_scale or TickScale()
+        self.append = append
+        self.by_day = shard_by in ("day", "day_symbol")
+        self.by_symbol = shard_by in ("symbol", "day_symbol")
+        self.symbol_buckets = symbol_buckets if self.by_symbol else 1
+        self.count = 0
+        # Shards write inline; the whole sharded writer is what goes on a thread
+        self.output_config = {k: v for k, v in output_config.items() if k != "background_writer"}
+        self.format = output_config.get("format", DEFAULT_OUTPUT_FORMAT)
+        self.compression = (
+            output_config.get("compression", "zstd") if self.format in ("parquet", "arrow")
+            else output_config.get("stream_compression", "none")
+        )
+        self.manifest = {
+            "record_type": "trade",
+            "format": self.format,
+            "compression": self.compression,
+            "shard_by": shard_by,
+            "symbol_buckets": self.symbol_buckets if self.by_symbol else None,
+            "total_rows": 0,
+            "shards": []
+        }
+        # (day ordinal or None, bucket or None) -> manifest entry
+        self._entries: Dict[Tuple[Optional[int], Optional[int]], Dict[str, Any]] = {}
+        self._writers: Dict[Tuple[Optional[int], Optional[int]], Any] = {}
+        # Day shards before this epoch day are complete
+        self._closed_before: Optional[int] = None
+        if append:
+            self._load_manifest()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.shard_dir / SHARD_MANIFEST_FILE
+
+    def _load_manifest(self) -> None:
+        if not self.manifest_path.is_file():
+            return
+        existing = load_manifest(str(self.manifest_path))
+        for entry in existing["shards"]:
+            day = (to_epoch_us(datetime.strptime(entry["day"], "%Y-%m-%d")) // DAY_US) if entry["day"] else None
+            entry = dict(entry)
+            entry["_valid_from_us"] = (
+                to_epoch_us(datetime.strptime(entry["valid_from_min"], _ISO_FORMAT)),
+                to_epoch_us(datetime.strptime(entry["valid_from_max"], _ISO_FORMAT))
+            )
+            self._entries[(day, entry["bucket"])] = entry
+
+    def _shard_name(self, day: Optional[int], bucket: Optional[int]) -> str:
+        parts = ["trades"]
+        if day is not None:
+            parts.append(date_from_epoch_us(day * DAY_US))
+        if bucket is not None:
+            parts.append(f"b{bucket:03d}")
+        return "-".join(parts) + FORMAT_SUFFIXES[self.format] + COMPRESSION_SUFFIXES.get(self.compression, "")
+
+    def _writer(self, key: Tuple[Optional[int], Optional[int]]) -> Any:
+        writer = self._writers.get(key)
+        if writer is None:
+            day, bucket = key
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "file": self._shard_name(day, bucket),
+                    "day": date_from_epoch_us(day * DAY_US) if day is not None else None,
+                    "bucket": bucket,
+                    "rows": 0,
+                    "_valid_from_us": None
+                }
+            path = self.shard_dir / entry["file"]
+            writer = self._writers[key] = open_writer(
+                str(path), self.output_config, self.price_scale, self.append and path.is_file()
+            )
+        return writer
+
+    def _close_shard(self, key: Tuple[Optional[int], Optional[int]]) -> None:
+        self._writers.pop(key).close()
+        entry = self._entries[key]
+        path = self.shard_dir / entry["file"]
+        entry["bytes"] = path.stat().st_size
+        entry["sha256"] = file_sha256(path)
+
+    def write(self, records: Union[TradeBatch, List[Dict[str, Any]]]) -> None:
+        if not isinstance(records, TradeBatch):
+            records = TradeBatch.from_records(records)
+        n = len(records)
+        if not n:
+            return
+
+        valid_from = records.ints["_valid_from"]
+        days = valid_from // DAY_US if self.by_day else np.zeros(n, dtype=np.int64)
+        if self.by_symbol:
+            symbols = records.categoricals["symbol"]
+            bucket_of = np.array(
+                [symbol_bucket(s, self.symbol_buckets) for s in symbols.categories], dtype=np.int64
+            )
+            buckets = bucket_of[symbols.codes] if len(bucket_of) else np.zeros(n, dtype=np.int64)
+        else:
+            buckets = np.zeros(n, dtype=np.int64)
+
+        if self.by_day and self._closed_before is not None and days.min() < self._closed_before:
+            raise ValueError(
+                f"Trade for {date_from_epoch_us(int(days.min()) * DAY_US)} arrived after its day shard "
+                f"was closed; day sharding needs trades in _valid_from order"
+            )
+
+        # Group the rows by shard, keeping their order within each shard
+        shard_ids = days * self.symbol_buckets + buckets
+        order = np.argsort(shard_ids, kind="stable")
+        ordered = shard_ids[order]
+        for rows in np.split(order, np.flatnonzero(np.diff(ordered)) + 1):
+            first = rows[0]
+            key = (
+                int(days[first]) if self.by_day else None,
+                int(buckets[first]) if self.by_symbol else None
+            )
+            self._writer(key).write(records.take(rows))
+            entry = self._entries[key]
+            entry["rows"] += len(rows)
+            low, high = int(valid_from[rows].min()), int(valid_from[rows].max())
+            if entry["_valid_from_us"] is not None:
+                low, high = min(low, entry["_valid_from_us"][0]), max(high, entry["_valid_from_us"][1])
+            entry["_valid_from_us"] = (low, high)
+        self.count += n
+
+        if self.by_day:
+            last_day = int(days.max())
+            for key in [k for k in self._writers if k[0] < last_day]:
+                self._close_shard(key)
+            self._closed_before = last_day
+
+    def close(self) -> None:
+        """Close the open shards and write the manifest."""
+        for key in list(self._writers):
+            self._close_shard(key)
+        shards = []
+        for key in sorted(self._entries, key=lambda k: (k[0] or 0, k[1] or 0)):
+            entry = {k: v for k, v in self._entries[key].items() if k != "_valid_from_us"}
+            low, high = self._entries[key]["_valid_from_us"]
+            entry["valid_from_min"] = iso_from_epoch_us(low)
+            entry["valid_from_max"] = iso_from_epoch_us(high)
+            shards.append(entry)
+        self.manifest["shards"] = shards
+        self.manifest["total_rows"] = sum(s["rows"] for s in shards)
+        # Written to a temporary file first so readers never see half a manifest
+        staging = self.manifest_path.with_suffix(".tmp")
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(staging, self.manifest_path)
+        logger.info(f"Wrote {len(shards)} trade shards ({self.manifest['total_rows']} rows) to {self.shard_dir}")
+
+    def __enter__(self) -> "ShardedTradeWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def open_trades_writer(
+    output_config: Dict[str, Any],
+    price_scale: Optional[TickScale] = None,
+    append: bool = False
+) -> Union[ShardedTradeWriter, BackgroundWriter, Any]:
+    """
+    The trades writer as configured under output: a ShardedTradeWriter over
+    shard_dir when shard_by is set, else the single trades_file writer.
+    """
+    shard_by = output_config.get("shard_by", "none")
+    if shard_by == "none":
+        return open_writer(output_config["trades_file"], output_config, price_scale, append)
+    writer = ShardedTradeWriter(
+        output_config.get("shard_dir", DEFAULT_SHARD_DIR),
+        output_config,
+        price_scale,
+        append,
+        shard_by,
+        output_config.get("symbol_buckets", DEFAULT_SYMBOL_BUCKETS)
+    )
+    if output_config.get("background_writer"):
+        return BackgroundWriter(writer)
+    return writer
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def shard_paths(manifest_path: str) -> List[str]:
+    """Paths of the shards listed in a manifest, in day then bucket order."""
+    base = Path(manifest_path).parent
+    return [str(base / shard["file"]) for shard in load_manifest(manifest_path)["shards"]]
+
+def verify_shards(manifest_path: str) -> List[str]:
+    """
+    Check every shard's size and SHA-256 against the manifest.
+
+    Returns:
+        The files that are missing or don't match (empty if all are intact)
+    """
+    base = Path(manifest_path).parent
+    bad = []
+    for shard in load_manifest(manifest_path)["shards"]:
+        path = base / shard["file"]
+        if not path.is_file() or path.stat().st_size != shard["bytes"] or file_sha256(path) != shard["sha256"]:
+            bad.append(shard["file"])
+    return bad
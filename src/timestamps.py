@@ -0,0 +1,78 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : timestamps.py
+# Description      : Integer epoch-microsecond timestamps used internally
+# by the generator and scenarios, and their ISO rendering for output.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# timestamps.py
+
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Union
+
+SECOND_US = 1_000_000
+MINUTE_US = 60 * SECOND_US
+HOUR_US = 60 * MINUTE_US
+DAY_US = 24 * HOUR_US
+
+# Record fields holding epoch microseconds, rendered as full UTC timestamps
+TIMESTAMP_FIELDS = ("execution_timestamp", "trade_report_time", "_valid_from", "_valid_to")
+# Record fields holding epoch microseconds, rendered as plain dates
+DATE_FIELDS = ("settlement_date",)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def to_epoch_us(value: Union[datetime, int]) -> int:
+    """
+    Convert a datetime to integer microseconds since the Unix epoch.
+    Naive datetimes are taken to be UTC; ints are passed through unchanged.
+    """
+    if isinstance(value, int):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * SECOND_US + delta.microseconds
+
+@lru_cache(maxsize=1 << 16)
+def _iso_second(epoch_seconds: int) -> str:
+    # Most records share their second with several others (execution time and
+    # _valid_from, minute-granular trade times), so this is mostly cache hits
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(epoch_seconds))
+
+@lru_cache(maxsize=1 << 12)
+def _iso_day(epoch_days: int) -> str:
+    return time.strftime('%Y-%m-%d', time.gmtime(epoch_days * 86400))
+
+def iso_from_epoch_us(epoch_us: int) -> str:
+    """Render epoch microseconds as '%Y-%m-%dT%H:%M:%S.%fZ'."""
+    seconds, micros = divmod(epoch_us, SECOND_US)
+    return f"{_iso_second(seconds)}.{micros:06d}Z"
+
+def date_from_epoch_us(epoch_us: int) -> str:
+    """Render epoch microseconds as '%Y-%m-%d'."""
+    return _iso_day(epoch_us // DAY_US)
+
+def render_timestamps(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the record with every epoch-microsecond field rendered as the ISO
+    string XTDB expects. Fields that already hold strings (e.g. records read
+    back from a JSON file) or None are left alone. The input is not modified.
+    """
+    rendered = None
+    for field in TIMESTAMP_FIELDS:
+        value = record.get(field)
+        if type(value) is int:
+            rendered = rendered or dict(record)
+            rendered[field] = iso_from_epoch_us(value)
+    for field in DATE_FIELDS:
+        value = record.get(field)
+        if type(value) is int:
+            rendered = rendered or dict(record)
+            rendered[field] = date_from_epoch_us(value)
+    return rendered or record
@@ -0,0 +1,363 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : trade_batch.py
+# Description      : Compact struct-of-arrays container for trades, passed
+# between the generator, scenarios, writers and the XTDB inserter.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# trade_batch.py
+
+import uuid
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Field order of the trade dict form
+TRADE_FIELDS = (
+    "_id", "type", "scenario_type",
+    "execution_timestamp", "symbol", "price", "quantity", "side",
+    "executing_broker_id", "executing_trader_id", "clearing_broker_id", "clearing_account",
+    "beneficial_owner_id", "account_type", "counterparty_id",
+    "_valid_from", "_valid_to",
+    "trade_report_time", "settlement_date", "trade_status",
+    "execution_venue", "execution_capacity", "algo_id"
+)
+
+# Epoch microseconds, integer ticks and share counts
+INT_FIELDS = (
+    "execution_timestamp", "price", "quantity", "_valid_from", "_valid_to",
+    "trade_report_time", "settlement_date"
+)
+# Stored as the NULL_INT sentinel when the value is None
+NULLABLE_INT_FIELDS = ("_valid_to",)
+NULL_INT = np.iinfo(np.int64).min
+
+# Low-cardinality strings, dictionary-encoded
+CATEGORICAL_FIELDS = tuple(
+    f for f in TRADE_FIELDS if f != "_id" and f not in INT_FIELDS
+)
+
+class DictionaryColumn:
+    """
+    A dictionary-encoded string column: one small integer code per row plus the
+    list of distinct values. Both the codes array and the categories list may
+    be shared with other columns (e.g. the generator's counterparty fields all
+    index one array of counterparty draws) and are copied before this column
+    ever changes them.
+    """
+    __slots__ = ("codes", "categories", "_lookup", "_owns_codes")
+
+    def __init__(self, codes: np.ndarray, categories: List[Any]):
+        self.codes = codes
+        self.categories = categories
+        self._lookup: Optional[Dict[Any, int]] = None
+        self._owns_codes = False
+
+    @classmethod
+    def encode(cls, values: Iterable[Any]) -> "DictionaryColumn":
+        lookup: Dict[Any, int] = {}
+        codes = [lookup.setdefault(v, len(lookup)) for v in values]
+        return cls(np.array(codes, dtype=np.int32), list(lookup))
+
+    @classmethod
+    def constant(cls, value: Any, n: int) -> "DictionaryColumn":
+        return cls(np.zeros(n, dtype=np.int32), [value])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def value(self, index: int) -> Any:
+        return self.categories[self.codes[index]]
+
+    def values(self) -> List[Any]:
+        categories = self.categories
+        return [categories[c] for c in self.codes.tolist()]
+
+    def code_for(self, value: Any) -> int:
+        """Code for a value, adding it to (a private copy of) the categories if new."""
+        if self._lookup is None:
+            self.categories = list(self.categories)
+            self._lookup = {v: i for i, v in enumerate(self.categories)}
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def set(self, index: int, value: Any) -> None:
+        if not self._owns_codes:
+            self.codes = self.codes.copy()
+            self._owns_codes = True
+        self.codes[index] = self.code_for(value)
+
+    def take(self, indices: Union[np.ndarray, slice]) -> "DictionaryColumn":
+        return DictionaryColumn(self.codes[indices], self.categories)
+
+    def compact(self) -> "DictionaryColumn":
+        """Drop categories no row uses, e.g. before pickling a batch to another process."""
+        used, codes = np.unique(self.codes, return_inverse=True)
+        return DictionaryColumn(codes.astype(np.int32), [self.categories[i] for i in used.tolist()])
+
+    @classmethod
+    def concat(cls, columns: Sequence["DictionaryColumn"]) -> "DictionaryColumn":
+        first = columns[0]
+        if all(c.categories is first.categories for c in columns):
+            return cls(np.concatenate([c.codes for c in columns]), first.categories)
+
+        # Merge the category lists and remap each column's codes into them
+        lookup: Dict[Any, int] = {}
+        remapped = []
+        for column in columns:
+            mapping = np.array(
+                [lookup.setdefault(v, len(lookup)) for v in column.categories], dtype=np.int32
+            )
+            remapped.append(mapping[column.codes] if len(mapping) else column.codes)
+        return cls(np.concatenate(remapped), list(lookup))
+
+class TradeRow(MutableMapping):
+    """
+    Lazy dict view of one row of a TradeBatch. Reads and writes go straight to
+    the batch's columns; fields outside the trade schema (pattern_role,
+    correction_reason, ...) live in the batch's sparse extras.
+    """
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "TradeBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def __getitem__(self, field: str) -> Any:
+        batch, i = self._batch, self._index
+        if field in batch.ints:
+            value = int(batch.ints[field][i])
+            return None if value == NULL_INT and field in NULLABLE_INT_FIELDS else value
+        if field in batch.categoricals:
+            return batch.categoricals[field].value(i)
+        if field == "_id":
+            return batch.id_at(i)
+        return batch.extras[i][field] if i in batch.extras and field in batch.extras[i] else _missing(field)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        batch, i = self._batch, self._index
+        if field in batch.ints:
+            batch.ints[field][i] = NULL_INT if value is None else value
+        elif field in batch.categoricals:
+            batch.categoricals[field].set(i, value)
+        elif field == "_id":
+            batch.ids[i] = _uuid_bytes(value)
+        else:
+            batch.extras.setdefault(i, {})[field] = value
+
+    def __delitem__(self, field: str) -> None:
+        extras = self._batch.extras.get(self._index, {})
+        if field not in extras:
+            raise KeyError(f"Cannot delete schema field {field!r} from a trade row")
+        del extras[field]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from TRADE_FIELDS
+        yield from self._batch.extras.get(self._index, {})
+
+    def __len__(self) -> int:
+        return len(TRADE_FIELDS) + len(self._batch.extras.get(self._index, {}))
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"TradeRow({dict(self)!r})"
+
+def _missing(field: str):
+    raise KeyError(field)
+
+def _uuid_bytes(value: str) -> np.ndarray:
+    return np.frombuffer(uuid.UUID(value).bytes, dtype=np.uint8)
+
+def _format_uuids(id_bytes: np.ndarray) -> List[str]:
+    """Format an (n, 16) uint8 array as UUID strings."""
+    hex_rows = [row.hex() for row in map(bytes, id_bytes)]
+    return [f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}" for h in hex_rows]
+
+class TradeBatch:
+    """
+    Struct-of-arrays block of trades.
+
+    - ids: (n, 16) uint8 array of raw UUID bytes
+    - ints: int64 NumPy columns for timestamps (epoch microseconds), price
+      (ticks) and quantity; _valid_to uses NULL_INT for None
+    - categoricals: DictionaryColumn per string field, so repeated values
+      (broker ids, venue, "trade", "executed", ...) cost a 4-byte code per row
+    - extras: sparse {row: {field: value}} for fields only some trades carry
+
+    batch[i] and iteration give lazy TradeRow dict views. iter_records() and
+    to_records() build plain trade dicts column by column, which is what the
+    writers use.
+    """
+    def __init__(
+        self,
+        ids: np.ndarray,
+        ints: Dict[str, np.ndarray],
+        categoricals: Dict[str, DictionaryColumn],
+        extras: Optional[Dict[int, Dict[str, Any]]] = None
+    ):
+        self.ids = ids
+        self.ints = ints
+        self.categoricals = categoricals
+        self.extras = extras or {}
+
+    @classmethod
+    def empty(cls) -> "TradeBatch":
+        return cls.from_records([])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[TradeRow, "TradeBatch"]:
+        if isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("TradeBatch index out of range")
+        return TradeRow(self, key)
+
+    def __iter__(self) -> Iterator[TradeRow]:
+        return (TradeRow(self, i) for i in range(len(self)))
+
+    def id_at(self, index: int) -> str:
+        return str(uuid.UUID(bytes=self.ids[index].tobytes()))
+
+    def column(self, field: str) -> Union[np.ndarray, List[Any]]:
+        """A whole column: int64 array for numeric fields, list of values otherwise."""
+        if field in self.ints:
+            return self.ints[field]
+        if field in self.categoricals:
+            return self.categoricals[field].values()
+        if field == "_id":
+            return _format_uuids(self.ids)
+        return [self.extras.get(i, {}).get(field) for i in range(len(self))]
+
+    def set_column(self, field: str, values: Any) -> None:
+        """
+        Overwrite a whole schema column with an array (numeric fields), a list
+        of values or a single value broadcast to every row.
+        """
+        n = len(self)
+        if field in self.ints:
+            if values is None:
+                values = NULL_INT
+            self.ints[field] = np.broadcast_to(np.asarray(values, dtype=np.int64), (n,)).copy()
+        elif field in self.categoricals:
+            if isinstance(values, (list, tuple)):
+                self.categoricals[field] = DictionaryColumn.encode(values)
+            else:
+                self.categoricals[field] = DictionaryColumn.constant(values, n)
+        else:
+            raise KeyError(f"{field!r} is not a trade column")
+
+    def take(self, indices: Union[np.ndarray, Sequence[int]]) -> "TradeBatch":
+        """New batch holding the given rows, in the given order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        extras = {}
+        if self.extras:
+            for new_i, old_i in enumerate(indices.tolist()):
+                if old_i in self.extras:
+                    extras[new_i] = dict(self.extras[old_i])
+        return TradeBatch(
+            self.ids[indices],
+            {k: v[indices] for k, v in self.ints.items()},
+            {k: v.take(indices) for k, v in self.categoricals.items()},
+            extras
+        )
+
+    def compact(self) -> "TradeBatch":
+        """Copy with every dictionary column trimmed to the categories in use."""
+        return TradeBatch(
+            self.ids,
+            self.ints,
+            {k: v.compact() for k, v in self.categoricals.items()},
+            self.extras
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["TradeBatch"]) -> "TradeBatch":
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        extras = {}
+        offset = 0
+        for batch in batches:
+            for i, fields in batch.extras.items():
+                extras[offset + i] = fields
+            offset += len(batch)
+
+        return cls(
+            np.concatenate([b.ids for b in batches]),
+            {k: np.concatenate([b.ints[k] for b in batches]) for k in INT_FIELDS},
+            {k: DictionaryColumn.concat([b.categoricals[k] for b in batches]) for k in CATEGORICAL_FIELDS},
+            extras
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TradeBatch":
+        """
+        Build a batch from trade dicts (timestamps in epoch microseconds, price
+        in ticks). Keys outside the trade schema are kept as extras.
+        """
+        records = list(records)
+        n = len(records)
+        ids = np.zeros((n, 16), dtype=np.uint8)
+        for i, record in enumerate(records):
+            ids[i] = _uuid_bytes(record["_id"])
+
+        ints = {}
+        for field in INT_FIELDS:
+            column = [record.get(field) for record in records]
+            ints[field] = np.array(
+                [NULL_INT if v is None else v for v in column], dtype=np.int64
+            )
+
+        categoricals = {
+            field: DictionaryColumn.encode(record.get(field) for record in records)
+            for field in CATEGORICAL_FIELDS
+        }
+
+        schema = set(TRADE_FIELDS)
+        extras = {}
+        for i, record in enumerate(records):
+            if len(record) > len(schema) or any(k not in schema for k in record):
+                fields = {k: v for k, v in record.items() if k not in schema}
+                if fields:
+                    extras[i] = fields
+        return cls(ids, ints, categoricals, extras)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Plain trade dicts, built column by column (one tolist() per column)."""
+        n = len(self)
+        if n == 0:
+            return
+        columns = [self.column(field) for field in TRADE_FIELDS]
+        for nullable in NULLABLE_INT_FIELDS:
+            position = TRADE_FIELDS.index(nullable)
+            array = self.ints[nullable]
+            columns[position] = [None if v == NULL_INT else v for v in array.tolist()]
+        for i, field in enumerate(TRADE_FIELDS):
+            if isinstance(columns[i], np.ndarray):
+                columns[i] = columns[i].tolist()
+
+        extras = self.extras
+        for i, values in enumerate(zip(*columns)):
+            record = dict(zip(TRADE_FIELDS, values))
+            if i in extras:
+                record.update(extras[i])
+            yield record
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self.iter_records())
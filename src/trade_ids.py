@@ -0,0 +1,93 @@
+# ************************************************************************
+# Author           : Suresh Nageswaran suresh@griddynamics.com
+# File Name        : trade_ids.py
+# Description      : Seeded, bulk trade-ID generation. IDs are drawn from a
+# NumPy RNG in blocks instead of one os.urandom call per uuid4(), so a
+# seeded run reproduces the same _ids.
+#
+# Revision History :
+# Date            Author            Comments
+#
+# ************************************************************************
+# trade_ids.py
+
+import uuid
+from typing import Optional, Union
+from datetime import datetime
+
+import numpy as np
+
+from timestamps import to_epoch_us
+
+# uuid4: fully random. uuid7: 48-bit millisecond timestamp prefix, so IDs sort
+# (and land in indexes) roughly in execution-time order.
+ID_FORMATS = ("uuid4", "uuid7")
+DEFAULT_ID_FORMAT = "uuid4"
+
+DEFAULT_BLOCK_SIZE = 4096
+
+def _stamp(id_bytes: np.ndarray, id_format: str, timestamps_us: Optional[np.ndarray]) -> np.ndarray:
+    """Set the version/variant bits (and the uuid7 timestamp) on rows of random bytes, in place."""
+    if id_format == "uuid7":
+        if timestamps_us is None:
+            raise ValueError("uuid7 trade IDs need a timestamp per ID")
+        millis = np.asarray(timestamps_us, dtype=np.int64) // 1000
+        for byte in range(6):
+            id_bytes[:, byte] = (millis >> (8 * (5 - byte))) & 0xFF
+        version = 0x70
+    else:
+        version = 0x40
+    id_bytes[:, 6] = (id_bytes[:, 6] & 0x0F) | version
+    id_bytes[:, 8] = (id_bytes[:, 8] & 0x3F) | 0x80
+    return id_bytes
+
+class TradeIdProvider:
+    """
+    Hands out trade IDs drawn from a seeded RNG.
+
+    bulk() stamps a whole array of IDs at once (the generator passes its day
+    RNG so a day's IDs don't depend on which shard draws them). next_id()
+    serves single IDs, e.g. for scenario trades, from a block of random bytes
+    drawn up front from the provider's own RNG.
+    """
+    def __init__(
+        self,
+        rng: np.random.Generator,
+        id_format: str = DEFAULT_ID_FORMAT,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ):
+        if id_format not in ID_FORMATS:
+            raise ValueError(f"Unknown trade ID format {id_format!r}; expected one of {ID_FORMATS}")
+        self.rng = rng
+        self.id_format = id_format
+        self.block_size = block_size
+        self._block = np.empty((0, 16), dtype=np.uint8)
+        self._next = 0
+
+    def bulk(
+        self,
+        n: int,
+        timestamps_us: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """
+        n IDs as an (n, 16) uint8 array of raw UUID bytes.
+
+        Args:
+            n: Number of IDs
+            timestamps_us: Execution time of each ID's trade (required for uuid7)
+            rng: RNG to draw from instead of the provider's own
+        """
+        id_bytes = (rng or self.rng).integers(0, 256, (n, 16), dtype=np.uint8)
+        return _stamp(id_bytes, self.id_format, timestamps_us)
+
+    def next_id(self, timestamp: Optional[Union[datetime, int]] = None) -> str:
+        """A single ID as a UUID string."""
+        if self._next == len(self._block):
+            self._block = self.rng.integers(0, 256, (self.block_size, 16), dtype=np.uint8)
+            self._next = 0
+        row = self._block[self._next:self._next + 1].copy()
+        self._next += 1
+
+        timestamps_us = None if timestamp is None else np.array([to_epoch_us(timestamp)])
+        return str(uuid.UUID(bytes=_stamp(row, self.id_format, timestamps_us).tobytes()))
@@ -17,20 +17,34 @@ import ijson # This is for streaming json, so I can handle larger files
 import aiofiles
 import json
 import logging
-from datetime import datetime, timezone
+import zlib
+from contextlib import AsyncExitStack
+from functools import lru_cache
 from typing import ( 
         Any,
         AsyncGenerator,
+        Awaitable,
+        Callable,
         List,
         Dict,
+        Set,
         Tuple,
-        Optional         
+        Optional,
+        Union
 )
 
 import psycopg as pg
 
 from decimal import Decimal
 
+from timestamps import render_timestamps
+from pricing import TickScale, DEFAULT_TICK_SIZE
+from trade_batch import TradeBatch
+from arrow_io import iter_arrow_batches, ARROW_FORMATS
+from output_writers import open_input
+from sharded_output import shard_paths, DEFAULT_SHARD_DIR, SHARD_MANIFEST_FILE
+from parallel_reader import ParallelRecordReader, is_splittable, DEFAULT_CHUNK_BYTES
+
 logger = logging.getLogger(__name__)
 
 async def prompt_user(question: str) -> str:
@@ -40,17 +54,48 @@ async def prompt_user(question: str) -> str:
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(None, input, question)
 
-class CustomJSONEncoder(json.JSONEncoder):
-    """
-    Custom JSON encoder to handle special data types in our trading data.
-    Ensures proper serialization of timestamps and decimal values for XTDB compatibility.
-    """
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super().default(obj)
+TRADE_INSERT_COLUMNS = (
+    "_id", "type", "scenario_type", "execution_timestamp",
+    "symbol", "price", "quantity", "side",
+    "executing_broker_id", "executing_trader_id",
+    "clearing_broker_id", "clearing_account",
+    "beneficial_owner_id", "account_type", "counterparty_id",
+    "trade_report_time", "settlement_date", "trade_status",
+    "execution_venue", "execution_capacity", "algo_id",
+    "_valid_from"
+)
+
+# We must include _valid_from in the initial insertion
+COUNTERPARTY_INSERT_COLUMNS = (
+    "_id", "type", "executing_broker_id", "clearing_broker_id",
+    "clearing_account", "correspondent_id", "beneficial_owner_id",
+    "account_type", "account_category", "status", "risk_rating",
+    "trading_limit", "credit_status", "margin_requirement",
+    "settlement_currency", "settlement_method", "settlement_cycle",
+    "_valid_from", "cp_update_sequence"
+)
+
+# "batched": multi-row INSERT statements; "row": one statement per document;
+# "copy": COPY ... FROM STDIN, falling back to "batched" where the server
+# doesn't support COPY
+INSERT_MODES = ("batched", "row", "copy")
+# Rows streamed through one COPY in "copy" mode
+DEFAULT_COPY_ROWS = 50000
+# Bind parameters allowed in one statement by the pgwire protocol
+MAX_BIND_PARAMETERS = 65535
+
+def copy_sql(table: str, columns: Tuple[str, ...]) -> str:
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+def id_partition(doc_id: str, partitions: int) -> int:
+    """Stable _id -> partition, so every version of a document lands on the same worker."""
+    return zlib.crc32(doc_id.encode("utf-8")) % partitions
+
+@lru_cache(maxsize=64)
+def insert_sql(table: str, columns: Tuple[str, ...], rows: int = 1) -> str:
+    """INSERT INTO table (columns) VALUES (%s, ...), ... for rows rows."""
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([placeholders] * rows)
 
 class XTDBInserter:
     """
@@ -82,22 +127,199 @@ class XTDBInserter:
         self.trades_file = config.get("output", {}).get("trades_file", "trades_data.json")
         self.counterparties_file = config.get("output", {}).get("counterparties_file", "counterparty_data.json")
         self.batch_size = config.get("execution_mode", {}).get("batch_size", 500)
+        self.insert_mode = config.get("execution_mode", {}).get("insert_mode", "batched")
+        if self.insert_mode not in INSERT_MODES:
+            raise ValueError(f"Unknown insert_mode {self.insert_mode!r}; expected one of {INSERT_MODES}")
+        self.copy_rows = config.get("execution_mode", {}).get("copy_rows", DEFAULT_COPY_ROWS)
+        # Set by detect_copy_support() once connected
+        self.copy_supported = False
+        # ingest_workers > 1 loads files on that many connections, fed from
+        # bounded queues of ingest_queue_depth batches per worker
+        self.ingest_workers = config.get("execution_mode", {}).get("ingest_workers", 1)
+        self.ingest_queue_depth = config.get("execution_mode", {}).get("ingest_queue_depth", 4)
+        self.partition_by_id = config.get("execution_mode", {}).get("partition_by_id", True)
+        # reader_workers > 1 parses json/ndjson files in a process pool
+        self.reader_workers = config.get("execution_mode", {}).get("reader_workers", 1)
+        self.reader_chunk_bytes = config.get("execution_mode", {}).get("reader_chunk_bytes", DEFAULT_CHUNK_BYTES)
+        self.reader_ordered = config.get("execution_mode", {}).get("reader_ordered", True)
+        # Layout of the files written by main.py: "json" (one array), "ndjson",
+        # "parquet" or "arrow"
+        self.input_format = config.get("output", {}).get("format", "json")
+        # With sharded output the trades are read shard by shard via the manifest
+        self.trades_manifest = None
+        if config.get("output", {}).get("shard_by", "none") != "none":
+            self.trades_manifest = os.path.join(
+                config["output"].get("shard_dir", DEFAULT_SHARD_DIR), SHARD_MANIFEST_FILE
+            )
         
+        # In-memory trades carry prices as integer ticks of this size
+        self.price_scale = TickScale(config.get("generation", {}).get("tick_size", DEFAULT_TICK_SIZE))
+
         logger.info(f"Opening {self.trades_file} and {self.counterparties_file} in XTDB Inserter with batch window of {self.batch_size}\n")
-        self.encoder = CustomJSONEncoder()
 
     
+    def _trade_values(self, trade: Dict[str, Any]) -> Tuple:
+        """Bind values for one trade, in TRADE_INSERT_COLUMNS order."""
+        # In-memory trades keep epoch-microsecond timestamps and tick prices
+        trade = render_timestamps(trade)
+        price = trade.get("price", 100.00)
+        if type(price) is int:
+            price = self.price_scale.to_decimal(price)
+        return (
+            trade["_id"],
+            trade.get("type", "trade"),
+            trade.get("scenario_type"),
+            trade.get("execution_timestamp"),
+            trade.get("symbol", "TEST"),
+            price,
+            trade.get("quantity", 1),
+            trade.get("side", "buy"),
+            trade.get("executing_broker_id"),
+            trade.get("executing_trader_id"),
+            trade.get("clearing_broker_id"),
+            trade.get("clearing_account"),
+            trade.get("beneficial_owner_id"),
+            trade.get("account_type"),
+            trade.get("counterparty_id"),
+            trade.get("trade_report_time"),
+            trade.get("settlement_date"),
+            trade.get("trade_status", "executed"),
+            trade.get("execution_venue"),
+            trade.get("execution_capacity"),
+            trade.get("algo_id", "NONE"),
+            trade.get("_valid_from"),  # Must be included at insertion time
+            #trade.get("_valid_to")     #  Excluded
+        )
+
+    def _counterparty_values(self, cp: Dict[str, Any]) -> Tuple:
+        """Bind values for one counterparty, in COUNTERPARTY_INSERT_COLUMNS order."""
+        cp = render_timestamps(cp)
+        # Safely access nested settlement_instructions
+        settlement_instructions = cp.get("settlement_instructions", {})
+        return (
+            cp["_id"],
+            cp.get("type", "counterparty"),
+            cp.get("executing_broker_id"),
+            cp.get("clearing_broker_id"),
+            cp.get("clearing_account"),
+            cp.get("correspondent_id"),
+            cp.get("beneficial_owner_id"),
+            cp.get("account_type"),
+            cp.get("account_category"),
+            cp.get("status", "active"),
+            cp.get("risk_rating"),
+            cp.get("trading_limit", 100000),
+            cp.get("credit_status"),
+            cp.get("margin_requirement"),
+            settlement_instructions.get("default_currency", "USD"),
+            settlement_instructions.get("settlement_method", "wire transfer"),
+            settlement_instructions.get("settlement_cycle", "T+2"),
+            cp.get("_valid_from"),  # Must be included at insertion time
+            # cp.get("_valid_to"),    # Excluded
+            cp.get("cp_update_sequence", 1)
+        )
+
+    async def detect_copy_support(self, cur) -> bool:
+        """
+        In "copy" insert_mode, check once per connection whether the server
+        accepts COPY ... FROM STDIN, by copying zero rows into counterparties.
+        Sets copy_supported; without COPY the inserts fall back to "batched".
+        """
+        self.copy_supported = False
+        if self.insert_mode != "copy":
+            return False
+        try:
+            async with cur.copy(copy_sql("counterparties", COUNTERPARTY_INSERT_COLUMNS)):
+                pass
+            self.copy_supported = True
+            logger.info("Server supports COPY FROM STDIN, bulk loading with COPY")
+        except Exception as e:
+            logger.warning(f"Server doesn't support COPY FROM STDIN ({e}); falling back to batched inserts")
+        return self.copy_supported
+
+    async def _copy_rows(
+        self,
+        cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[Tuple[str, Tuple]]
+    ) -> None:
+        """Stream rows into table with one COPY ... FROM STDIN (text format)."""
+        async with cur.copy(copy_sql(table, columns)) as copy:
+            for _, values in rows:
+                await copy.write_row(values)
+
+    async def _insert_rows(
+        self,
+        cur,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: List[Tuple[str, Tuple]]
+    ) -> Tuple[int, int]:
+        """
+        Insert (_id, values) rows into table. In "batched" insert_mode rows go
+        in multi-row INSERT ... VALUES statements of up to batch_size rows
+        (fewer if the bind parameters would pass the protocol limit), one
+        round trip each. A statement that fails inserts nothing, so its rows
+        are retried one at a time to find and count the bad ones. In "row"
+        mode every row is its own statement.
+
+        In "copy" mode, once detect_copy_support() has found COPY available,
+        all the rows go through one COPY. A COPY that fails loads nothing and
+        the rows are inserted in batches instead, with the same per-row
+        accounting.
+
+        Returns:
+            (rows inserted, rows failed)
+        """
+        if self.copy_supported and rows:
+            try:
+                await self._copy_rows(cur, table, columns, rows)
+                return len(rows), 0
+            except Exception as e:
+                logger.warning(f"COPY of {len(rows)} {table} rows failed ({e}); inserting them in batches")
+
+        success_count = 0
+        error_count = 0
+        per_statement = 1 if self.insert_mode == "row" else max(
+            1, min(self.batch_size, MAX_BIND_PARAMETERS // len(columns))
+        )
+
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            if len(chunk) > 1:
+                try:
+                    await cur.execute(
+                        insert_sql(table, columns, len(chunk)),
+                        [value for _, values in chunk for value in values]
+                    )
+                    success_count += len(chunk)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Batched insert of {len(chunk)} {table} rows failed ({e}); retrying row by row")
+
+            for row_id, values in chunk:
+                try:
+                    if self.insert_mode == "row":
+                        logger.info(f"Inserting {table} row {row_id} with complete bitemporal data")
+                    await cur.execute(insert_sql(table, columns), values)
+                    success_count += 1
+                except Exception as e:
+                    logger.error(f"Failed to insert {table} row {row_id}: {e}")
+                    error_count += 1
+        return success_count, error_count
+
     async def insert_trades(
         self,
         cur,
-        trades: List[Dict[str, Any]]
+        trades: Union[TradeBatch, List[Dict[str, Any]]]
     ) -> bool:        
         """
         Insert trade documents into XTDB, following XTDB's bitemporal design patterns.
         
         Args:
             cur: Database cursor
-            trades: List of trade documents to insert
+            trades: TradeBatch or list of trade documents to insert
         """
         
         logging.info("Inside insert_trades ...creating query string for insert")
@@ -111,61 +333,18 @@ class XTDBInserter:
         #     print("Exiting by request ...")
         #     return False
         
-        success_count = 0
+        rows = []
         error_count = 0
-        
-        for trade in trades:
+        records = trades.iter_records() if isinstance(trades, TradeBatch) else trades
+        for trade in records:
             try:
-                # Insert with all fields in a single query
-                insert_query = """
-                INSERT INTO trades (
-                    _id, type, scenario_type, execution_timestamp,
-                    symbol, price, quantity, side,
-                    executing_broker_id, executing_trader_id,
-                    clearing_broker_id, clearing_account,
-                    beneficial_owner_id, account_type, counterparty_id,
-                    trade_report_time, settlement_date, trade_status,
-                    execution_venue, execution_capacity, algo_id,
-                    _valid_from
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                """
-                
-                values = (
-                    trade["_id"],
-                    trade.get("type", "trade"),
-                    trade.get("scenario_type"),
-                    trade.get("execution_timestamp"),
-                    trade.get("symbol", "TEST"),
-                    trade.get("price", 100.00),
-                    trade.get("quantity", 1),
-                    trade.get("side", "buy"),
-                    trade.get("executing_broker_id"),
-                    trade.get("executing_trader_id"),
-                    trade.get("clearing_broker_id"),
-                    trade.get("clearing_account"),
-                    trade.get("beneficial_owner_id"),
-                    trade.get("account_type"),
-                    trade.get("counterparty_id"),
-                    trade.get("trade_report_time"),
-                    trade.get("settlement_date"),
-                    trade.get("trade_status", "executed"),
-                    trade.get("execution_venue"),
-                    trade.get("execution_capacity"),
-                    trade.get("algo_id", "NONE"),
-                    trade.get("_valid_from"),  # Must be included at insertion time
-                    #trade.get("_valid_to")     #  Excluded
-                )
-                
-                logger.info(f"Inserting trade {trade['_id']} with complete bitemporal data")
-                await cur.execute(insert_query, values)
-                success_count += 1
-                
+                rows.append((trade["_id"], self._trade_values(trade)))
             except Exception as e:
                 logger.error(f"Failed to insert trade {trade.get('_id', 'unknown')}: {e}")
                 error_count += 1
-                continue
+
+        success_count, failed = await self._insert_rows(cur, "trades", TRADE_INSERT_COLUMNS, rows)
+        error_count += failed
         
         total = len(trades)
         logger.info(f"Trade insertion complete: {success_count}/{total} successful, {error_count}/{total} failed")
@@ -204,60 +383,17 @@ class XTDBInserter:
         #     print("Exiting by request...")
         #     return False
         
-        success_count = 0
+        rows = []
         error_count = 0
-        
         for cp in counterparties:
             try:
-                # Safely access nested settlement_instructions
-                settlement_instructions = cp.get("settlement_instructions", {})
-                
-                # Create a single insertion with all fields
-                # We must include _valid_in the initial insertion
-                insert_query = """
-                INSERT INTO counterparties 
-                (_id, type, executing_broker_id, clearing_broker_id,
-                clearing_account, correspondent_id, beneficial_owner_id,
-                account_type, account_category, status, risk_rating,
-                trading_limit, credit_status, margin_requirement,
-                settlement_currency, settlement_method, settlement_cycle,
-                _valid_from, cp_update_sequence)
-                VALUES 
-                (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                values = (
-                    cp["_id"],
-                    cp.get("type", "counterparty"),
-                    cp.get("executing_broker_id"),
-                    cp.get("clearing_broker_id"),
-                    cp.get("clearing_account"),
-                    cp.get("correspondent_id"),
-                    cp.get("beneficial_owner_id"),
-                    cp.get("account_type"),
-                    cp.get("account_category"),
-                    cp.get("status", "active"),
-                    cp.get("risk_rating"),
-                    cp.get("trading_limit", 100000),
-                    cp.get("credit_status"),
-                    cp.get("margin_requirement"),
-                    settlement_instructions.get("default_currency", "USD"),
-                    settlement_instructions.get("settlement_method", "wire transfer"),
-                    settlement_instructions.get("settlement_cycle", "T+2"),
-                    cp.get("_valid_from"),  # Must be included at insertion time
-                    # cp.get("_valid_to"),    # Excluded
-                    cp.get("cp_update_sequence", 1)
-                )
-                
-                # Process one record at a time
-                logger.info(f"Inserting counterparty {cp['_id']} with complete bitemporal data {values}")
-                await cur.execute(insert_query, values)
-                success_count += 1
-                
+                rows.append((cp["_id"], self._counterparty_values(cp)))
             except Exception as e:
                 logger.error(f"Failed to insert counterparty {cp.get('_id', 'unknown')}: {e}")
                 error_count += 1
-                continue
+
+        success_count, failed = await self._insert_rows(cur, "counterparties", COUNTERPARTY_INSERT_COLUMNS, rows)
+        error_count += failed
         
         # Report the results
         total = len(counterparties)
@@ -309,8 +445,8 @@ class XTDBInserter:
         records_processed = 0
 
         try:
-            # Open file in binary mode for ijson
-            with open(file_name, 'rb') as file:
+            # Open file in binary mode for ijson (decompressing .gz / .zst output)
+            with open_input(file_name) as file:
                 # ijson.items(file, 'item') streams each object in a top-level JSON array
                 for item in ijson.items(file, 'item'):
                     current_batch.append(item)
@@ -334,9 +470,268 @@ class XTDBInserter:
             logger.error(f"Error streaming JSON from {file_name}: {str(e)}")
             raise
  
+    async def stream_ndjson_data(
+        self,
+        file_name: str
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Stream newline-delimited JSON (one object per line) in batches.
+
+        Numbers with a fraction come back as Decimal, as they do from ijson.
+        A last line cut short by an interrupted write is skipped with a
+        warning; a malformed line anywhere else is an error.
+
+        Args:
+            file_name (str): Path to the NDJSON file.
+
+        Yields:
+            List[Dict[str, Any]]: Batches of parsed objects from the file.
+        """
+        current_batch: List[Dict[str, Any]] = []
+        records_processed = 0
+
+        try:
+            with open_input(file_name) as file:
+                for line_number, line in enumerate(file, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        item = json.loads(line, parse_float=Decimal)
+                    except json.JSONDecodeError:
+                        # Only the final line can be partial
+                        if not line.endswith(b"\n") and not file.read(1):
+                            logger.warning(f"Skipping truncated last line {line_number} of {file_name}")
+                            break
+                        raise ValueError(f"Malformed JSON on line {line_number} of {file_name}")
+                    current_batch.append(item)
+                    records_processed += 1
+
+                    if len(current_batch) >= self.batch_size:
+                        yield current_batch
+                        current_batch = []
+
+                    # If test_mode is set, stop after N total records
+                    if self.test_mode and records_processed >= self.test_mode:
+                        break
+
+            if current_batch:
+                yield current_batch
+
+        except Exception as e:
+            logger.error(f"Error streaming NDJSON from {file_name}: {str(e)}")
+            raise
+
+    async def stream_arrow_data(
+        self,
+        file_name: str
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Stream a Parquet or Arrow IPC output file in batches. Timestamps come
+        back as datetimes and prices as Decimals, which psycopg binds directly.
+
+        Args:
+            file_name (str): Path to the Parquet or Arrow file.
+
+        Yields:
+            List[Dict[str, Any]]: Batches of records from the file.
+        """
+        records_processed = 0
+        try:
+            for batch in iter_arrow_batches(file_name, self.batch_size):
+                if self.test_mode and records_processed + len(batch) >= self.test_mode:
+                    yield batch[:self.test_mode - records_processed]
+                    break
+                records_processed += len(batch)
+                yield batch
+        except Exception as e:
+            logger.error(f"Error streaming {self.input_format} from {file_name}: {str(e)}")
+            raise
+
+    async def stream_parallel_data(
+        self,
+        file_name: str
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Stream an uncompressed JSON or NDJSON file in batches, parsed by
+        ParallelRecordReader on reader_workers processes. With reader_ordered
+        off, batches arrive in whatever order their ranges finish parsing.
+
+        Args:
+            file_name (str): Path to the JSON or NDJSON file.
+
+        Yields:
+            List[Dict[str, Any]]: Batches of parsed objects from the file.
+        """
+        records_processed = 0
+        reader = ParallelRecordReader(
+            file_name,
+            self.reader_workers,
+            self.reader_chunk_bytes,
+            self.reader_ordered
+        )
+        try:
+            async for records in reader.iter_async():
+                for start in range(0, len(records), self.batch_size):
+                    batch = records[start:start + self.batch_size]
+                    if self.test_mode and records_processed + len(batch) >= self.test_mode:
+                        yield batch[:self.test_mode - records_processed]
+                        return
+                    records_processed += len(batch)
+                    yield batch
+        except Exception as e:
+            logger.error(f"Error streaming {self.input_format} from {file_name}: {str(e)}")
+            raise
+
+    def stream_records(self, file_name: str) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Batches of records from an output file in the configured input format."""
+        if self.input_format in ("json", "ndjson") and self.reader_workers > 1 and is_splittable(file_name):
+            return self.stream_parallel_data(file_name)
+        if self.input_format == "ndjson":
+            return self.stream_ndjson_data(file_name)
+        if self.input_format == "json":
+            return self.stream_json_data(file_name)
+        if self.input_format in ARROW_FORMATS:
+            return self.stream_arrow_data(file_name)
+        raise ValueError(f"Unknown input format {self.input_format!r}")
+
+    def trade_files(self) -> List[str]:
+        """The trades output: every shard in manifest order, or the single trades_file."""
+        if self.trades_manifest:
+            return shard_paths(self.trades_manifest)
+        return [self.trades_file]
+
+    async def _rebatch(
+        self,
+        batches: AsyncGenerator[List[Dict[str, Any]], None],
+        size: int
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Regroup a stream of batches into batches of size records."""
+        pending: List[Dict[str, Any]] = []
+        async for batch in batches:
+            pending.extend(batch)
+            while len(pending) >= size:
+                yield pending[:size]
+                pending = pending[size:]
+        if pending:
+            yield pending
+
+    async def stream_trade_records(self) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Batches of trades from every trades file, with test_mode capping the total."""
+        records_processed = 0
+        for file_name in self.trade_files():
+            async for batch in self.stream_records(file_name):
+                if self.test_mode and records_processed + len(batch) >= self.test_mode:
+                    yield batch[:self.test_mode - records_processed]
+                    return
+                records_processed += len(batch)
+                yield batch
+
+    async def _run_worker_pool(
+        self,
+        conns: List[Any],
+        batches: AsyncGenerator[List[Dict[str, Any]], None],
+        insert: Callable[[Any, List[Dict[str, Any]]], Awaitable[bool]]
+    ) -> None:
+        """
+        A reader task moves batches into bounded asyncio queues and one worker
+        per connection drains them, inserting and committing each batch. The
+        reader waits whenever the queues are full, so memory stays bounded.
+
+        With partition_by_id every worker has its own queue and each batch is
+        split by _id hash, so all the versions of a document go through the
+        same worker in file order. Otherwise the workers share one queue,
+        sized so each worker still has ingest_queue_depth batches queued.
+        A failing worker cancels the others and the error propagates.
+        """
+        workers = len(conns)
+        if self.partition_by_id:
+            queues = [asyncio.Queue(maxsize=self.ingest_queue_depth) for _ in range(workers)]
+        else:
+            queues = [asyncio.Queue(maxsize=self.ingest_queue_depth * workers)]
+
+        async def read() -> None:
+            async for batch in batches:
+                if len(queues) == 1:
+                    await queues[0].put(batch)
+                    continue
+                parts: List[List[Dict[str, Any]]] = [[] for _ in queues]
+                for record in batch:
+                    parts[id_partition(record.get("_id", ""), workers)].append(record)
+                for queue, part in zip(queues, parts):
+                    if part:
+                        await queue.put(part)
+            # One end marker per worker
+            for i in range(workers):
+                await queues[i % len(queues)].put(None)
+
+        async def work(conn: Any, queue: asyncio.Queue) -> None:
+            async with conn.cursor() as cur:
+                while (batch := await queue.get()) is not None:
+                    await insert(cur, batch)
+                    await conn.commit()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(read())
+                for i, conn in enumerate(conns):
+                    group.create_task(work(conn, queues[i % len(queues)]))
+        except ExceptionGroup as errors:
+            # Report the first failure rather than the group
+            raise errors.exceptions[0]
+
+    async def ingest_files_with_workers(
+        self,
+        conn: Any,
+        load_size: Optional[int] = None,
+        test_mode_limit: Optional[int] = None
+    ) -> Set[str]:
+        """
+        File ingestion on ingest_workers connections (conn plus new ones):
+        counterparties first, then trades once every counterparty is in, each
+        through _run_worker_pool().
+
+        Returns:
+            The counterparty _ids read, when test_mode is on
+        """
+        processed_cp_ids: Set[str] = set()
+
+        async def counterparty_batches() -> AsyncGenerator[List[Dict[str, Any]], None]:
+            batches = self.stream_records(self.counterparties_file)
+            async for cp_batch in (self._rebatch(batches, load_size) if load_size else batches):
+                # If test_mode is enabled, track CP IDs
+                if test_mode_limit:
+                    processed_cp_ids.update(cp['_id'] for cp in cp_batch)
+                yield cp_batch
+
+        async def trade_batches() -> AsyncGenerator[List[Dict[str, Any]], None]:
+            batches = self.stream_trade_records()
+            async for trade_batch in (self._rebatch(batches, load_size) if load_size else batches):
+                # If in test mode and we have a set of valid CP IDs, filter trades
+                if test_mode_limit and processed_cp_ids:
+                    trade_batch = [t for t in trade_batch if t.get('counterparty_id') in processed_cp_ids]
+                if trade_batch:
+                    yield trade_batch
+
+        async with AsyncExitStack() as stack:
+            conns = [conn]
+            for _ in range(self.ingest_workers - 1):
+                worker_conn = await stack.enter_async_context(
+                    await pg.AsyncConnection.connect(**self.db_config, autocommit=True)
+                )
+                worker_conn.adapters.register_dumper(str, pg.types.string.StrDumperVarchar)
+                conns.append(worker_conn)
+
+            logger.info(f"Inserting counterparties from {self.counterparties_file} on {len(conns)} connections...")
+            await self._run_worker_pool(conns, counterparty_batches(), self.insert_counterparties)
+
+            logger.info(f"Inserting trades from {self.trades_manifest or self.trades_file} on {len(conns)} connections...")
+            await self._run_worker_pool(conns, trade_batches(), self.insert_trades)
+
+        return processed_cp_ids
+
     async def ingest_bitemporal_data(
         self,
-        trades: Optional[List[Dict[str, Any]]] = None,
+        trades: Optional[Union[TradeBatch, List[Dict[str, Any]]]] = None,
         counterparties: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
@@ -347,7 +742,7 @@ class XTDBInserter:
         - If `test_mode` is enabled, limits the number of records inserted.
 
         Args:
-            trades (Optional[List[Dict[str, Any]]]): List of trade documents to insert.
+            trades (Optional[Union[TradeBatch, List[Dict[str, Any]]]]): Trades to insert.
             counterparties (Optional[List[Dict[str, Any]]]): List of counterparty documents to insert.
 
         Returns:
@@ -368,13 +763,21 @@ class XTDBInserter:
 
                 async with conn.cursor() as cur:
                     processed_cp_ids = set()
+                    await self.detect_copy_support(cur)
+                    # A COPY streams many reader batches at once
+                    load_size = self.copy_rows if self.copy_supported else None
+
+                    # FILE-BASED INGESTION, on a pool of connections
+                    if is_file_ingestion and self.ingest_workers > 1:
+                        processed_cp_ids = await self.ingest_files_with_workers(conn, load_size, test_mode_limit)
 
                     # FILE-BASED INGESTION
-                    if is_file_ingestion:
+                    elif is_file_ingestion:
                         # 1) Process counterparties
                         logger.info(f"Inserting counterparties from {self.counterparties_file} in batches...")
 
-                        async for cp_batch in self.stream_json_data(self.counterparties_file):
+                        cp_batches = self.stream_records(self.counterparties_file)
+                        async for cp_batch in (self._rebatch(cp_batches, load_size) if load_size else cp_batches):
                             # If test_mode is enabled, track CP IDs
                             if test_mode_limit:
                                 processed_cp_ids.update(cp['_id'] for cp in cp_batch)
@@ -383,9 +786,10 @@ class XTDBInserter:
                             await conn.commit()  # commit after each batch
 
                         # 2) Process trades
-                        logger.info(f"Inserting trades from {self.trades_file} in batches...")
+                        logger.info(f"Inserting trades from {self.trades_manifest or self.trades_file} in batches...")
 
-                        async for trade_batch in self.stream_json_data(self.trades_file):
+                        trade_batches = self.stream_trade_records()
+                        async for trade_batch in (self._rebatch(trade_batches, load_size) if load_size else trade_batches):
                             # If in test mode and we have a set of valid CP IDs, filter trades
                             if test_mode_limit and processed_cp_ids:
                                 trade_batch = [
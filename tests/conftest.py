@@ -0,0 +1,6 @@
+# tests/conftest.py
+# The modules under src/ import each other as top-level modules
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,30 @@
+# tests/test_counterparty_registry.py
+import random
+
+from counterparty_registry import CounterpartyRegistry
+
+def _cp(i, owner, account_type):
+    return {"_id": f"CP{i:03d}", "beneficial_owner_id": owner, "account_type": account_type}
+
+def test_indexes_and_choice_follow_updates():
+    registry = CounterpartyRegistry(_cp(i, f"BO{i % 3}", "IPR"[i % 3]) for i in range(30))
+    rand = random.Random(5)
+    for _ in range(500):
+        i = rand.randrange(30)
+        registry.update(_cp(i, f"BO{rand.randrange(4)}", "IPRX"[rand.randrange(4)]))
+        for owner in ("BO0", "BO1", "BO2", "BO3"):
+            expected = {cp["_id"] for cp in registry if cp["beneficial_owner_id"] == owner}
+            assert {cp["_id"] for cp in registry.by_beneficial_owner(owner)} == expected
+
+        excluded = f"CP{rand.randrange(30):03d}"
+        picked = registry.choice(rand, account_types=["I", "P"], exclude=excluded)
+        assert picked is None or (picked["_id"] != excluded and picked["account_type"] in ("I", "P"))
+        picked = registry.choice(rand, beneficial_owner="BO1", exclude=excluded)
+        assert picked is None or (picked["_id"] != excluded and picked["beneficial_owner_id"] == "BO1")
+        assert registry.choice(rand, exclude=excluded)["_id"] != excluded
+
+    # A copy doesn't see later changes to the original
+    snapshot = registry.copy()
+    registry.update(_cp(0, "BO_NEW", "N"))
+    assert snapshot.by_beneficial_owner("BO_NEW") == []
+    assert [cp["_id"] for cp in registry.by_beneficial_owner("BO_NEW")] == ["CP000"]
@@ -0,0 +1,35 @@
+# tests/test_dataset_cache.py
+import copy
+import os
+
+import yaml
+
+import main
+from dataset_cache import dataset_cache_key
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "..", "src", "config.yaml")
+
+def _generate(config, out_dir):
+    config = copy.deepcopy(config)
+    for key in ("trades_file", "counterparties_file", "checkpoint_file", "labels_file", "sql_file"):
+        config["output"][key] = str(out_dir / os.path.basename(config["output"][key]))
+    main.setup_output_directories(config)
+    assert main.generate_output_files(config)
+    with open(config["output"]["trades_file"], "rb") as trades, \
+         open(config["output"]["labels_file"], "rb") as labels:
+        return trades.read(), labels.read()
+
+def test_same_key_generates_identical_files(tmp_path):
+    """The cache assumes the config and seed alone decide the output files."""
+    with open(CONFIG_FILE) as f:
+        config = yaml.safe_load(f)
+    config["date_range"] = {"start_date": "2025-02-03", "end_date": "2025-02-05"}
+    config["scenario_schedule"]["enabled"] = True
+    other = copy.deepcopy(config)
+    other["generation"]["workers"] = 2
+    assert dataset_cache_key(config) == dataset_cache_key(other)
+
+    first = _generate(config, tmp_path / "first")
+    second = _generate(other, tmp_path / "second")
+    assert first[0] and first[1]
+    assert first == second
@@ -0,0 +1,9 @@
+# tests/test_detection_benchmark.py
+from detection_benchmark import STANDIN_DETECTION_QUERIES, standin_drift, xtdb_detection_queries
+
+def test_every_xtdb_detection_has_a_standin():
+    assert set(xtdb_detection_queries()) == set(STANDIN_DETECTION_QUERIES)
+
+def test_standins_follow_the_current_xtdb_queries():
+    """Fails when queries.py is edited without updating the matching stand-in and its digest."""
+    assert standin_drift() == []
@@ -0,0 +1,32 @@
+# tests/test_external_sort.py
+from datetime import datetime
+
+import numpy as np
+
+from external_sort import ExternalTradeSorter
+from generator import BitemporalDataGenerator
+
+def _batches(count, size):
+    generator = BitemporalDataGenerator(
+        "2025-02-03", "2025-02-04", {"generation": {"seed": 11, "trades_per_day": size}}
+    )
+    rng = np.random.default_rng(3)
+    for _ in range(count):
+        batch = generator.generate_trades_batch(size, datetime(2025, 2, 3))
+        # Only a handful of distinct _valid_from values, so most rows tie and
+        # the order between them comes down to the _id
+        batch.set_column("_valid_from", rng.integers(0, 5, size=size) * 1_000_000)
+        yield batch
+
+def test_spilled_runs_merge_in_valid_from_then_id_order(tmp_path):
+    written = []
+    with ExternalTradeSorter(run_rows=25, chunk_rows=7, tmp_dir=str(tmp_path)) as sorter:
+        for batch in _batches(6, 20):
+            written.extend((row["_valid_from"], row["_id"]) for row in batch)
+            sorter.write(batch)
+        assert len(sorter._runs) > 1
+
+        merged = [(row["_valid_from"], row["_id"]) for batch in sorter.sorted_batches() for row in batch]
+
+    assert merged == sorted(written)
+    assert not list(tmp_path.iterdir())
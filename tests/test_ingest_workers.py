@@ -0,0 +1,52 @@
+# tests/test_ingest_workers.py
+import asyncio
+from contextlib import asynccontextmanager
+
+from xtdb_inserter import XTDBInserter
+
+class FakeConnection:
+    """Just enough of an async psycopg connection for _run_worker_pool()."""
+    def __init__(self, name):
+        self.name = name
+        self.commits = 0
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def commit(self):
+        self.commits += 1
+
+def test_partition_by_id_keeps_each_documents_versions_on_one_worker_in_order():
+    inserter = XTDBInserter({"execution_mode": {"partition_by_id": True, "ingest_queue_depth": 1}})
+    conns = [FakeConnection(f"worker-{i}") for i in range(3)]
+    # Five versions each of twelve documents, interleaved the way corrections
+    # and counterparty changes are in the output files
+    records = [{"_id": f"doc-{doc}", "version": version} for version in range(5) for doc in range(12)]
+    inserted = []
+
+    async def batches():
+        for start in range(0, len(records), 7):
+            yield records[start:start + 7]
+
+    async def insert(cur, batch):
+        # Give the other workers a chance to run between inserts
+        for _ in range(len(batch)):
+            await asyncio.sleep(0)
+        inserted.extend((cur.name, record["_id"], record["version"]) for record in batch)
+        return True
+
+    asyncio.run(inserter._run_worker_pool(conns, batches(), insert))
+
+    assert sorted((doc, version) for _, doc, version in inserted) == sorted(
+        (r["_id"], r["version"]) for r in records
+    )
+    workers_by_doc = {}
+    versions_by_doc = {}
+    for worker, doc, version in inserted:
+        workers_by_doc.setdefault(doc, set()).add(worker)
+        versions_by_doc.setdefault(doc, []).append(version)
+    assert all(len(workers) == 1 for workers in workers_by_doc.values())
+    assert all(versions == list(range(5)) for versions in versions_by_doc.values())
+    assert len({w for workers in workers_by_doc.values() for w in workers}) > 1
+    assert sum(conn.commits for conn in conns) > 0
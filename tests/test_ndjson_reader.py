@@ -0,0 +1,28 @@
+# tests/test_ndjson_reader.py
+import asyncio
+
+import pytest
+
+from xtdb_inserter import XTDBInserter
+
+def _read(path):
+    inserter = XTDBInserter({"execution_mode": {"batch_size": 2}})
+
+    async def collect():
+        return [batch async for batch in inserter.stream_ndjson_data(str(path))]
+    return asyncio.run(collect())
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "trades.ndjson"
+    path.write_text('{"_id": "a"}\n{"_id": "b"}\n{"_id": "c"}\n{"_id": "d", "pri')
+
+    batches = _read(path)
+
+    assert [[r["_id"] for r in batch] for batch in batches] == [["a", "b"], ["c"]]
+
+def test_malformed_middle_line_raises(tmp_path):
+    path = tmp_path / "trades.ndjson"
+    path.write_text('{"_id": "a"}\n{"_id": "b", \n{"_id": "c"}\n')
+
+    with pytest.raises(ValueError, match="line 2"):
+        _read(path)
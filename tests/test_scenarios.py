@@ -0,0 +1,25 @@
+# tests/test_scenarios.py
+import random
+from datetime import datetime
+
+from generator import BitemporalDataGenerator
+from scenarios import SCENARIO_REGISTRY
+
+def test_every_leg_of_an_instance_trades_one_configured_security():
+    generator = BitemporalDataGenerator(
+        "2025-02-03", "2025-02-04", {"generation": {"seed": 11, "trades_per_day": 20}}
+    )
+    for name, pattern in SCENARIO_REGISTRY.items():
+        for seed in range(10):
+            trades = pattern(generator, datetime(2025, 2, 3), rand=random.Random(seed))
+            symbols = set(trades.column("symbol"))
+            assert len(symbols) == 1, (name, symbols)
+            assert symbols <= set(generator.security_tickers)
+
+def test_a_pinned_symbol_is_used_for_every_leg():
+    generator = BitemporalDataGenerator(
+        "2025-02-03", "2025-02-04", {"generation": {"seed": 11, "trades_per_day": 20}}
+    )
+    for pattern in SCENARIO_REGISTRY.values():
+        trades = pattern(generator, datetime(2025, 2, 3), symbol="MSFT", rand=random.Random(1))
+        assert set(trades.column("symbol")) == {"MSFT"}
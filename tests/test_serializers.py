@@ -0,0 +1,32 @@
+# tests/test_serializers.py
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from serializers import available_backends
+
+RECORD = {
+    "_id": "4f1c2e9a-0000-4000-8000-000000000001",
+    "price": Decimal("123.40"),
+    "quantity": 300,
+    "naive": datetime(2025, 2, 3, 9, 30, 5),
+    "aware": datetime(2025, 1, 1, 0, 0, tzinfo=timezone(timedelta(hours=2))),
+    "with_micros": datetime(2025, 2, 3, 9, 30, 5, 123456, tzinfo=timezone.utc),
+    "nested": {"times": [datetime(2025, 2, 4), {"at": datetime(2025, 2, 5, 1, 2, 3)}]},
+    "symbol": "AAPL",
+    "_valid_to": None
+}
+
+def test_every_backend_encodes_the_same_bytes():
+    encoded = {
+        name: cls(None).dumps(RECORD) for name, cls in available_backends().items()
+    }
+    assert len(set(encoded.values())) == 1, encoded
+    assert b'"aware":"2024-12-31T22:00:00.000000Z"' in encoded["stdlib"]
+    assert b'"naive":"2025-02-03T09:30:05.000000Z"' in encoded["stdlib"]
+
+def test_indented_output_matches_across_backends():
+    encoded = {
+        name: cls(4).dumps(RECORD)
+        for name, cls in available_backends().items() if cls.supports_indent(4)
+    }
+    assert len(set(encoded.values())) == 1, encoded
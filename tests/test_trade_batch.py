@@ -0,0 +1,28 @@
+# tests/test_trade_batch.py
+from datetime import datetime
+
+from generator import BitemporalDataGenerator
+
+COUNTERPARTY_FIELDS = (
+    "executing_broker_id", "clearing_broker_id", "clearing_account",
+    "beneficial_owner_id", "account_type", "counterparty_id", "execution_capacity"
+)
+
+def _batch():
+    generator = BitemporalDataGenerator(
+        "2025-02-03", "2025-02-04", {"generation": {"seed": 7, "trades_per_day": 20}}
+    )
+    return generator.generate_trades_batch(5, datetime(2025, 2, 3))
+
+def test_setting_a_counterparty_field_leaves_the_others_unchanged():
+    batch = _batch()
+    before = [dict(row) for row in batch]
+    new_values = {"counterparty_id": "CP_NEW", "account_type": "RETAIL_X"}
+
+    for field, value in new_values.items():
+        batch[0][field] = value
+
+    for i, row in enumerate(batch):
+        for field in COUNTERPARTY_FIELDS:
+            expected = new_values.get(field) if i == 0 and field in new_values else before[i][field]
+            assert row[field] == expected, (i, field)